@@ -1,114 +1,2511 @@
-import matplotlib.pyplot as plt
-import matplotlib.animation as animation
-from matplotlib.widgets import Button, Slider, RadioButtons
+# pyplot and the widgets are imported where the GUI is built, so headless
+# commands start without them
 import numpy as np
+import argparse
+import array
+import heapq
+import math
+import multiprocessing
+import json
+import os
+import platform
 import random
+import shutil
+import struct
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import OrderedDict, deque
 
-# Algorithm definitions
-algorithms = {
-    'Bubble Sort': {
-        'time': 'O(n²)',
-        'space': 'O(1)',
-        'best': 'O(n)',
-        'stable': 'Yes',
-        'description': '''Bubble Sort is the simplest sorting algorithm. It works by repeatedly 
+# Algorithm registry. register_algorithm() files an algorithm's info panel
+# metadata under `algorithms` and, for algorithms that sort an in-memory
+# list, its generator under `sort_generators`; the selector, races,
+# benchmarks and the CLI all read these two dicts, so adding an algorithm
+# is one call next to its generator. `options` names the visualizer
+# settings handed to the generator as keyword arguments ('pivot', 'seed').
+# in_memory=False generators take a file of EXTERNAL_DTYPE keys instead;
+# in_process=False marks generators that hand work to a process pool or to
+# files: they are kept out of step-count dry runs and of races.
+# expensive=True marks algorithms whose step count can grow much faster
+# than n log n on some input (O(n²) worst cases, Shell Sort's gaps); the
+# trace server gives them its smaller size limit.
+algorithms = {}
+sort_generators = {}
+
+
+def register_algorithm(name, generator, time, space, best, stable, description,
+                       how_it_works, options=(), in_memory=True, in_process=True,
+                       expensive=False):
+    algorithms[name] = {
+        'time': time,
+        'space': space,
+        'best': best,
+        'stable': stable,
+        'description': description,
+        'how_it_works': how_it_works,
+        'generator': generator,
+        'options': tuple(options),
+        'in_memory': in_memory,
+        'in_process': in_process,
+        'expensive': expensive,
+    }
+    if in_memory:
+        sort_generators[name] = generator
+    return generator
+
+# Step events yielded by the sorting generators. Every event is a plain
+# tuple (op, a, b, text) so one stream can feed the renderer, the trace
+# recorder and the counters without any consumer rebuilding full state:
+#   OP_COMPARE  a, b = indices being compared
+#   OP_SWAP     a, b = indices being swapped
+#   OP_WRITE    a = index, b = value written
+#   OP_SORTED   a, b = half-open range [a, b) now in final position
+#   OP_STEP     text-only step, a and b are unused
+#   OP_AUX      a = index into the auxiliary buffer, b = value written
+#   OP_WORKER   a = index, b = worker that now owns the element
+#   OP_READ     a = index whose key is read without a comparison
+#   OP_AUX_COMPARE  a = index into the auxiliary buffer, b = index into
+#                   the array, whose keys are being compared
+# text is the step description, a string or a step template tuple (see
+# format_step), or None to keep the previous one.
+OP_COMPARE = 0
+OP_SWAP = 1
+OP_WRITE = 2
+OP_SORTED = 3
+OP_STEP = 4
+OP_AUX = 5
+OP_WORKER = 6
+OP_READ = 7
+OP_AUX_COMPARE = 8
+
+# Per-element display states, indexes into a renderer palette
+STATE_UNSORTED = 0
+STATE_COMPARING = 1
+STATE_SWAPPING = 2
+STATE_SORTED = 3
+# Elements owned by parallel worker w are in state STATE_WORKER + w % WORKER_STATES
+STATE_WORKER = 4
+WORKER_STATES = 8
+
+# Step texts. Inner loops yield (template id, *args) instead of a formatted
+# string, so the formatting only happens for frames that get drawn or
+# printed; format_step() turns any event text into a string. Templates are
+# str.format strings interned once, and plain strings remain valid texts.
+# Only fixed templates belong in STEP_TEMPLATES: it is never trimmed.
+STEP_TEMPLATES = []
+_step_template_ids = {}
+_step_template_lock = threading.Lock()
+
+
+def step_template(template):
+    template_id = _step_template_ids.get(template)
+    if template_id is None:
+        with _step_template_lock:
+            template_id = _step_template_ids.get(template)
+            if template_id is None:
+                STEP_TEMPLATES.append(template)
+                template_id = _step_template_ids[template] = len(STEP_TEMPLATES) - 1
+    return template_id
+
+
+def format_step(text):
+    if text is None or isinstance(text, str):
+        return text
+    return STEP_TEMPLATES[text[0]].format(*text[1:])
+
+
+def encode_step(text):
+    # Fixed-width (template id, arg, arg) form of a text, -1 for None, as
+    # stored by traces and the timeline. Plain strings and texts with more
+    # or non-int32 args come back formatted in place of the id, as a
+    # template without fields; callers keep those in a table of their own.
+    if text is None:
+        return -1, 0, 0
+    if text.__class__ is tuple and len(text) <= 3:
+        template_id, x, y = (*text, 0, 0)[:3]
+        if (x.__class__ is int and y.__class__ is int
+                and -2 ** 31 <= x < 2 ** 31 and -2 ** 31 <= y < 2 ** 31):
+            return template_id, x, y
+    text = format_step(text)
+    return text.replace('{', '{{').replace('}', '}}'), 0, 0
+
+
+TEXT_COMPARE = step_template('Comparing {} and {}')
+TEXT_COMPARE_WITH = step_template('Comparing {} with {}')
+TEXT_COMPARE_INDICES = step_template('Comparing elements at index {} and {}')
+TEXT_SWAP = step_template('Swapping {} and {}')
+TEXT_PICK = step_template('Picking element {} to insert into sorted portion')
+TEXT_SHIFT = step_template('Shifting {} to the right')
+TEXT_SHIFT_BY = step_template('Shifting {} {} to the right')
+TEXT_INSERT = step_template('Inserting {} at position {}')
+TEXT_MEDIAN = step_template('Median of three: comparing {} and {}')
+TEXT_COMPARE_CHILDREN = step_template('Comparing children {} and {}')
+TEXT_COMPARE_PARENT = step_template('Comparing parent {} with child {}')
+TEXT_SIFT = step_template('Sifting {} down past {}')
+TEXT_MOVE_MAX = step_template('Moving max {} to index {}')
+TEXT_DIVIDE = step_template('Dividing array at index {}')
+TEXT_MOVE_PIVOT = step_template('Moving pivot {} to index {}')
+TEXT_CHOOSE_PIVOT = step_template('Choosing pivot: {} at index {}')
+TEXT_COMPARE_PIVOT = step_template('Comparing {} with pivot {}')
+TEXT_PIVOT_LEFT = step_template('{} < pivot: swapping into the left part')
+TEXT_PIVOT_RIGHT = step_template('{} > pivot: swapping into the right part')
+TEXT_EQUAL_KEYS = step_template('{} keys equal to {} in place')
+TEXT_COUNT = step_template('Counting {}: seen {} time(s)')
+TEXT_BUCKET = step_template('{} goes to bucket {}')
+TEXT_PLACE = step_template('Placing {} at output position {}')
+TEXT_COPY_BACK = step_template('Copying {} back to index {}')
+TEXT_RUN_START = step_template('Looking for a run at index {}')
+TEXT_BINARY_SEARCH = step_template('Binary search for {}: probing {}')
+TEXT_GALLOP = step_template('Galloping: {} against {}')
+TEXT_GALLOP_LEFT = step_template('Gallop: {} key(s) from the left run')
+TEXT_GALLOP_RIGHT = step_template('Gallop: {} key(s) from the right run')
+TEXT_WIDTH = step_template('Merging runs of width {}')
+TEXT_BUILD_HEAP = step_template('Building max-heap on [{}..{}]')
+TEXT_DEPTH_LIMIT = step_template('Depth {} exceeds limit {}: switching to heapsort')
+TEXT_KEY_RANGE = step_template('Key range {}..{}: one counter per key')
+TEXT_DIGIT_PASS = step_template('Pass {}: distributing by the digit worth {}')
+TEXT_GAP = step_template('Insertion sort on elements {} apart')
+TEXT_REVERSE_RUN = step_template('Reversing descending run [{}..{}]')
+TEXT_MERGE_RUNS = step_template('Merging runs of {} and {} key(s)')
+TEXT_SHORT_RUN = step_template('Run at {} is short: binary insertion up to {}')
+
+
+class StateTracker:
+    # Applies step events to a display array and an array-backed state
+    # buffer. Highlights from the previous event are reverted and the new
+    # ones set, so each event costs O(1) (O(b - a) for OP_SORTED) and the
+    # indices touched since the last render are collected in `dirty`. The
+    # auxiliary buffer and its states are only allocated once an OP_AUX
+    # event arrives; its highlight is cleared on the next event.
+    def __init__(self, array):
+        n = len(array)
+        self.array = array
+        self.base = bytearray(n)
+        self.state = bytearray(n)
+        self.highlighted = ()
+        self.dirty = set()
+        self.aux = None
+        self.aux_state = None
+        self.aux_highlighted = ()
+        self.aux_dirty = set()
+        self.text = ''
+        self.steps = 0
+        self.comparisons = 0
+        self.writes = 0
+        
+    def apply(self, event):
+        op, a, b, text = event
+        state = self.state
+        dirty = self.dirty
+        for i in self.highlighted:
+            state[i] = self.base[i]
+            dirty.add(i)
+        self.highlighted = ()
+        if self.aux_highlighted:
+            for i in self.aux_highlighted:
+                self.aux_state[i] = STATE_UNSORTED
+            self.aux_dirty.update(self.aux_highlighted)
+            self.aux_highlighted = ()
+        
+        if op == OP_COMPARE:
+            state[a] = state[b] = STATE_COMPARING
+            self.highlighted = (a, b)
+            self.comparisons += 1
+        elif op == OP_SWAP:
+            arr = self.array
+            arr[a], arr[b] = arr[b], arr[a]
+            state[a] = state[b] = STATE_SWAPPING
+            self.highlighted = (a, b)
+            self.writes += 2
+        elif op == OP_WRITE:
+            self.array[a] = b
+            state[a] = STATE_SWAPPING
+            self.highlighted = (a,)
+            self.writes += 1
+        elif op == OP_SORTED:
+            base = self.base
+            for i in range(a, b):
+                base[i] = state[i] = STATE_SORTED
+            dirty.update(range(a, b))
+        elif op == OP_AUX:
+            if self.aux is None:
+                self.aux = (np.zeros_like(self.array) if isinstance(self.array, np.ndarray)
+                            else [0] * len(self.array))
+                self.aux_state = bytearray(len(self.array))
+            self.aux[a] = b
+            self.aux_dirty.add(a)
+            self.writes += 1
+        elif op == OP_WORKER:
+            self.base[a] = state[a] = STATE_WORKER + b % WORKER_STATES
+            dirty.add(a)
+        elif op == OP_READ:
+            state[a] = STATE_COMPARING
+            self.highlighted = (a,)
+        elif op == OP_AUX_COMPARE:
+            state[b] = STATE_COMPARING
+            self.highlighted = (b,)
+            self.aux_state[a] = STATE_COMPARING
+            self.aux_highlighted = (a,)
+            self.aux_dirty.add(a)
+            self.comparisons += 1
+        dirty.update(self.highlighted)
+        
+        if text is not None:
+            self.text = text
+        self.steps += 1
+        
+    def copy(self):
+        # Independent checkpoint of the display state (dirty set excluded)
+        clone = StateTracker(self.array.copy())
+        clone.base = bytearray(self.base)
+        clone.state = bytearray(self.state)
+        clone.highlighted = self.highlighted
+        clone.aux = None if self.aux is None else self.aux.copy()
+        clone.aux_state = None if self.aux_state is None else bytearray(self.aux_state)
+        clone.aux_highlighted = self.aux_highlighted
+        clone.text = self.text
+        clone.steps = self.steps
+        clone.comparisons = self.comparisons
+        clone.writes = self.writes
+        return clone
+        
+    def restore(self, checkpoint):
+        # Rewinds in place so the display array keeps its identity; the
+        # caller is responsible for a full redraw
+        self.array[:] = checkpoint.array
+        self.base[:] = checkpoint.base
+        self.state[:] = checkpoint.state
+        self.highlighted = checkpoint.highlighted
+        self.aux = None if checkpoint.aux is None else checkpoint.aux.copy()
+        self.aux_state = None if checkpoint.aux_state is None else bytearray(checkpoint.aux_state)
+        self.aux_highlighted = checkpoint.aux_highlighted
+        self.aux_dirty.clear()
+        self.text = checkpoint.text
+        self.steps = checkpoint.steps
+        self.comparisons = checkpoint.comparisons
+        self.writes = checkpoint.writes
+        self.dirty.clear()
+
+
+# Sorting algorithms as generators. Each one sorts `arr` in place and yields
+# a step event for every visible operation; callers hand in a private copy
+# and let a StateTracker replay the events onto the displayed array.
+def bubble_sort(arr):
+    n = len(arr)
+    for i in range(n - 1):
+        for j in range(n - i - 1):
+            yield (OP_COMPARE, j, j + 1, (TEXT_COMPARE_INDICES, j, j + 1))
+            
+            if arr[j] > arr[j + 1]:
+                yield (OP_SWAP, j, j + 1, (TEXT_SWAP, arr[j], arr[j + 1]))
+                arr[j], arr[j + 1] = arr[j + 1], arr[j]
+                
+        yield (OP_SORTED, n - 1 - i, n - i, None)
+        
+    yield (OP_SORTED, 0, n, 'Sorting complete!')
+    
+    
+register_algorithm(
+    'Bubble Sort', bubble_sort,
+    time='O(n²)',
+    space='O(1)',
+    best='O(n)',
+    stable='Yes',
+    description='''Bubble Sort is the simplest sorting algorithm. It works by repeatedly 
 stepping through the list, comparing adjacent elements and swapping them 
 if they are in the wrong order. The pass through the list is repeated 
 until no swaps are needed, which indicates that the list is sorted.''',
-        'how_it_works': [
-            '1. Compare adjacent elements from left to right',
-            '2. If the left element is greater, swap them',
-            '3. Move to the next pair and repeat',
-            '4. After each pass, largest element "bubbles up"',
-            '5. Repeat until no swaps are needed'
-        ]
-    },
-    'Insertion Sort': {
-        'time': 'O(n²)',
-        'space': 'O(1)',
-        'best': 'O(n)',
-        'stable': 'Yes',
-        'description': '''Insertion Sort builds the final sorted array one item at a time. 
+    how_it_works=[
+        '1. Compare adjacent elements from left to right',
+        '2. If the left element is greater, swap them',
+        '3. Move to the next pair and repeat',
+        '4. After each pass, largest element "bubbles up"',
+        '5. Repeat until no swaps are needed'
+    ],
+    expensive=True)
+
+
+def insertion_sort(arr):
+    n = len(arr)
+    for i in range(1, n):
+        key = arr[i]
+        j = i - 1
+        
+        yield (OP_SORTED, i - 1, i, (TEXT_PICK, key))
+        
+        while j >= 0:
+            yield (OP_COMPARE, j, j + 1, (TEXT_COMPARE_WITH, arr[j], key))
+            if arr[j] <= key:
+                break
+            yield (OP_WRITE, j + 1, arr[j], (TEXT_SHIFT, arr[j]))
+            arr[j + 1] = arr[j]
+            j -= 1
+            
+        yield (OP_WRITE, j + 1, key, (TEXT_INSERT, key, j + 1))
+        arr[j + 1] = key
+        
+    yield (OP_SORTED, 0, n, 'Sorting complete!')
+    
+    
+register_algorithm(
+    'Insertion Sort', insertion_sort,
+    time='O(n²)',
+    space='O(1)',
+    best='O(n)',
+    stable='Yes',
+    description='''Insertion Sort builds the final sorted array one item at a time. 
 It is much like sorting playing cards in your hands - you pick up one 
 card at a time and insert it into its correct position among the 
 already-sorted cards.''',
-        'how_it_works': [
-            '1. Start from second element (first is sorted)',
-            '2. Compare current with sorted portion',
-            '3. Shift larger elements one position right',
-            '4. Insert current element in correct position',
-            '5. Move to next element and repeat'
-        ]
-    },
-    'Merge Sort': {
-        'time': 'O(n log n)',
-        'space': 'O(n)',
-        'best': 'O(n log n)',
-        'stable': 'Yes',
-        'description': '''Merge Sort is a divide-and-conquer algorithm. It divides the input 
+    how_it_works=[
+        '1. Start from second element (first is sorted)',
+        '2. Compare current with sorted portion',
+        '3. Shift larger elements one position right',
+        '4. Insert current element in correct position',
+        '5. Move to next element and repeat'
+    ],
+    expensive=True)
+
+
+def merge_sort(arr, bottom_up=False):
+    # One auxiliary buffer serves every merge. Only the left run is copied
+    # out; the right run is read in place, which is safe because the write
+    # position never overtakes it. The bottom-up variant merges runs of
+    # doubling width in a loop, so there is no generator recursion at all.
+    n = len(arr)
+    aux = [None] * n
+    
+    def merge(l, m, r):
+        for i in range(l, m + 1):
+            aux[i] = arr[i]
+            yield (OP_AUX, i, aux[i], None)
+        i, j, k = l, m + 1, l
+        
+        while i <= m and j <= r:
+            yield (OP_AUX_COMPARE, i, j, (TEXT_COMPARE, aux[i], arr[j]))
+            
+            if aux[i] <= arr[j]:
+                arr[k] = aux[i]
+                i += 1
+            else:
+                arr[k] = arr[j]
+                j += 1
+                
+            yield (OP_WRITE, k, arr[k], None)
+            k += 1
+            
+        # Whatever is left of the right run is already in place
+        while i <= m:
+            arr[k] = aux[i]
+            yield (OP_WRITE, k, arr[k], None)
+            i += 1
+            k += 1
+            
+    def sort(l, r):
+        if l < r:
+            m = (l + r) // 2
+            yield (OP_STEP, 0, 0, (TEXT_DIVIDE, m))
+            yield from sort(l, m)
+            yield from sort(m + 1, r)
+            yield from merge(l, m, r)
+            
+    if bottom_up:
+        width = 1
+        while width < n:
+            yield (OP_STEP, 0, 0, (TEXT_WIDTH, width))
+            for l in range(0, n - width, 2 * width):
+                yield from merge(l, l + width - 1, min(l + 2 * width, n) - 1)
+            width *= 2
+    else:
+        yield from sort(0, n - 1)
+    yield (OP_SORTED, 0, n, f'Sorting complete! Aux buffer size: {sys.getsizeof(aux):,} B')
+    
+    
+def merge_sort_bottom_up(arr):
+    return merge_sort(arr, bottom_up=True)
+    
+    
+register_algorithm(
+    'Merge Sort', merge_sort,
+    time='O(n log n)',
+    space='O(n)',
+    best='O(n log n)',
+    stable='Yes',
+    description='''Merge Sort is a divide-and-conquer algorithm. It divides the input 
 array into two halves, recursively sorts them, and then merges the two 
 sorted halves. It guarantees O(n log n) time complexity in all cases, 
 making it efficient for large datasets.''',
-        'how_it_works': [
-            '1. Divide the array into two halves',
-            '2. Recursively sort each half',
-            '3. Merge two sorted halves by comparing',
-            '4. Place the smaller element first',
-            '5. Continue until all elements are merged'
-        ]
-    },
-    'Quick Sort': {
-        'time': 'O(n log n)',
-        'space': 'O(log n)',
-        'best': 'O(n log n)',
-        'stable': 'No',
-        'description': '''Quick Sort is a highly efficient divide-and-conquer algorithm. 
+    how_it_works=[
+        '1. Divide the array into two halves',
+        '2. Recursively sort each half',
+        '3. Merge two sorted halves by comparing',
+        '4. Place the smaller element first',
+        '5. Continue until all elements are merged'
+    ])
+
+
+register_algorithm(
+    'Merge Sort (bottom-up)', merge_sort_bottom_up,
+    time='O(n log n)',
+    space='O(n)',
+    best='O(n log n)',
+    stable='Yes',
+    description='''Bottom-up Merge Sort skips the recursion entirely. It treats the 
+array as n sorted runs of length 1 and merges neighbouring runs in 
+passes of width 1, 2, 4, ... until one run is left. Both variants 
+merge through a single auxiliary buffer, shown below the bars.''',
+    how_it_works=[
+        '1. Start with runs of width 1',
+        '2. Copy the left run into the buffer',
+        '3. Merge it with the right run in place',
+        '4. Double the width after every pass',
+        '5. Done when one run spans the array'
+    ])
+
+
+# Input distributions. Each takes a NumPy Generator, n and the value range
+# and builds the whole array with vectorized operations, so millions of
+# elements take milliseconds and a (distribution, n, seed) triple always
+# reproduces the same input.
+def _uniform(rng, n, low, high):
+    return rng.integers(low, high + 1, n)
+
+
+def _sorted(rng, n, low, high):
+    return np.sort(_uniform(rng, n, low, high))
+
+
+def _reversed(rng, n, low, high):
+    return _sorted(rng, n, low, high)[::-1].copy()
+
+
+def _nearly_sorted(rng, n, low, high, swaps=None):
+    arr = _sorted(rng, n, low, high)
+    if n > 1:
+        k = swaps if swaps is not None else max(1, n // 100)
+        # The swaps are applied one after another to an index permutation;
+        # a vectorized swap loses keys whenever a position repeats
+        order = np.arange(n)
+        for i, j in zip(rng.integers(0, n, k).tolist(), rng.integers(0, n, k).tolist()):
+            order[i], order[j] = order[j], order[i]
+        arr = arr[order]
+    return arr
+
+
+def _few_unique(rng, n, low, high, unique=5):
+    levels = np.linspace(low, high, unique).round().astype(np.int64)
+    return levels[rng.integers(0, unique, n)]
+
+
+def _sawtooth(rng, n, low, high, teeth=4):
+    tooth = max(1, -(-n // teeth))
+    return low + (np.arange(n) % tooth) * (high - low) // max(1, tooth - 1)
+
+
+def _organ_pipe(rng, n, low, high):
+    x = np.arange(n)
+    return low + np.minimum(x, n - 1 - x) * (high - low) // max(1, (n - 1) // 2)
+
+
+def _gaussian(rng, n, low, high):
+    values = rng.normal((low + high) / 2, (high - low) / 6, n)
+    return values.round().clip(low, high).astype(np.int64)
+
+
+def _sorted_with_tail(rng, n, low, high, tail=None):
+    t = tail if tail is not None else max(1, n // 10)
+    t = min(t, n)
+    return np.concatenate([_sorted(rng, n - t, low, high), _uniform(rng, t, low, high)])
+
+
+DISTRIBUTIONS = {
+    'uniform': _uniform,
+    'sorted': _sorted,
+    'reversed': _reversed,
+    'nearly sorted': _nearly_sorted,
+    'few unique': _few_unique,
+    'sawtooth': _sawtooth,
+    'organ pipe': _organ_pipe,
+    'gaussian': _gaussian,
+    'sorted + tail': _sorted_with_tail,
+}
+
+
+def generate_input(distribution='uniform', n=25, seed=None, low=10, high=100):
+    # Returns an int64 NumPy array; seed=None draws a fresh random input
+    rng = np.random.default_rng(seed)
+    return np.asarray(DISTRIBUTIONS[distribution](rng, n, low, high), dtype=np.int64)
+
+
+# Quick sort pivot strategies, GUI label -> quick_sort(pivot=...)
+PIVOT_STRATEGIES = {
+    'Last element': 'last',
+    'Median of 3': 'median3',
+    'Random': 'random',
+    'Ninther': 'ninther',
+}
+
+
+def median_of_three(arr, i, j, k):
+    # Yields the comparisons and returns the index holding the median
+    yield (OP_COMPARE, i, j, (TEXT_MEDIAN, arr[i], arr[j]))
+    if arr[i] > arr[j]:
+        i, j = j, i
+    yield (OP_COMPARE, j, k, (TEXT_MEDIAN, arr[j], arr[k]))
+    if arr[j] <= arr[k]:
+        return j
+    yield (OP_COMPARE, i, k, (TEXT_MEDIAN, arr[i], arr[k]))
+    return k if arr[i] <= arr[k] else i
+
+
+def choose_pivot(arr, low, high, strategy, rng=random):
+    if strategy == 'last':
+        return high
+    if strategy == 'random':
+        return rng.randint(low, high)
+    mid = (low + high) // 2
+    if strategy == 'ninther' and high - low >= 8:
+        s = (high - low + 1) // 8
+        a = yield from median_of_three(arr, low, low + s, low + 2 * s)
+        b = yield from median_of_three(arr, mid - s, mid, mid + s)
+        c = yield from median_of_three(arr, high - 2 * s, high - s, high)
+        return (yield from median_of_three(arr, a, b, c))
+    if strategy in ('median3', 'ninther'):
+        return (yield from median_of_three(arr, low, mid, high))
+    raise ValueError(f'Unknown pivot strategy: {strategy}')
+
+
+def heap_sort_range(arr, lo, hi):
+    size = hi - lo + 1
+    
+    def sift_down(root, end):
+        while 2 * root + 1 < end:
+            child = 2 * root + 1
+            if child + 1 < end:
+                yield (OP_COMPARE, lo + child, lo + child + 1,
+                       (TEXT_COMPARE_CHILDREN, arr[lo + child], arr[lo + child + 1]))
+                if arr[lo + child] < arr[lo + child + 1]:
+                    child += 1
+            yield (OP_COMPARE, lo + root, lo + child,
+                   (TEXT_COMPARE_PARENT, arr[lo + root], arr[lo + child]))
+            if arr[lo + root] >= arr[lo + child]:
+                return
+            yield (OP_SWAP, lo + root, lo + child,
+                   (TEXT_SIFT, arr[lo + root], arr[lo + child]))
+            arr[lo + root], arr[lo + child] = arr[lo + child], arr[lo + root]
+            root = child
+            
+    yield (OP_STEP, 0, 0, (TEXT_BUILD_HEAP, lo, hi))
+    for start in range(size // 2 - 1, -1, -1):
+        yield from sift_down(start, size)
+    for end in range(size - 1, 0, -1):
+        yield (OP_SWAP, lo, lo + end, (TEXT_MOVE_MAX, arr[lo], lo + end))
+        arr[lo], arr[lo + end] = arr[lo + end], arr[lo]
+        yield (OP_SORTED, lo + end, lo + end + 1, None)
+        yield from sift_down(0, end)
+    if size > 0:
+        yield (OP_SORTED, lo, lo + 1, None)
+        
+        
+def quick_sort(arr, pivot='last', three_way=False, introsort=False, seed=None):
+    # Iterative quick sort. pivot picks the strategy (see PIVOT_STRATEGIES),
+    # three_way uses a Dutch national flag partition so runs of equal keys
+    # are finished in one pass, and introsort hands any range deeper than
+    # 2*log2(n) partitions to heapsort, bounding the worst case. seed makes
+    # the random pivot strategy reproducible.
+    n = len(arr)
+    rng = random.Random(seed)
+    depth_limit = 2 * (n.bit_length() - 1) if n else 0
+    stack = [(0, n - 1, 0)]
+    while stack:
+        low, high, depth = stack.pop()
+        if low >= high:
+            continue
+        if introsort and depth > depth_limit:
+            yield (OP_STEP, 0, 0, (TEXT_DEPTH_LIMIT, depth, depth_limit))
+            yield from heap_sort_range(arr, low, high)
+            continue
+            
+        # The pivot is moved to the end for Lomuto, to the front for 3-way
+        p = yield from choose_pivot(arr, low, high, pivot, rng)
+        target = low if three_way else high
+        if p != target:
+            yield (OP_SWAP, p, target, (TEXT_MOVE_PIVOT, arr[p], target))
+            arr[p], arr[target] = arr[target], arr[p]
+        pivot_value = arr[target]
+        yield (OP_STEP, 0, 0, (TEXT_CHOOSE_PIVOT, pivot_value, target))
+        
+        if three_way:
+            lt, i, gt = low, low + 1, high
+            while i <= gt:
+                yield (OP_COMPARE, i, lt, (TEXT_COMPARE_PIVOT, arr[i], pivot_value))
+                if arr[i] < pivot_value:
+                    yield (OP_SWAP, lt, i, (TEXT_PIVOT_LEFT, arr[i]))
+                    arr[lt], arr[i] = arr[i], arr[lt]
+                    lt += 1
+                    i += 1
+                elif arr[i] > pivot_value:
+                    yield (OP_SWAP, i, gt, (TEXT_PIVOT_RIGHT, arr[i]))
+                    arr[i], arr[gt] = arr[gt], arr[i]
+                    gt -= 1
+                else:
+                    i += 1
+            yield (OP_SORTED, lt, gt + 1, (TEXT_EQUAL_KEYS, gt - lt + 1, pivot_value))
+            stack.append((gt + 1, high, depth + 1))
+            stack.append((low, lt - 1, depth + 1))
+            continue
+            
+        i = low - 1
+        for j in range(low, high):
+            yield (OP_COMPARE, j, high, (TEXT_COMPARE_PIVOT, arr[j], pivot_value))
+            
+            if arr[j] < pivot_value:
+                i += 1
+                if i != j:
+                    yield (OP_SWAP, i, j, (TEXT_SWAP, arr[i], arr[j]))
+                    arr[i], arr[j] = arr[j], arr[i]
+                    
+        pi = i + 1
+        yield (OP_SWAP, pi, high, 'Placing pivot in correct position')
+        arr[pi], arr[high] = arr[high], arr[pi]
+        yield (OP_SORTED, pi, pi + 1, None)
+        
+        stack.append((pi + 1, high, depth + 1))
+        stack.append((low, pi - 1, depth + 1))
+        
+    yield (OP_SORTED, 0, n, 'Sorting complete!')
+
+
+def quick_sort_3way(arr, pivot='last', seed=None):
+    return quick_sort(arr, pivot, three_way=True, seed=seed)
+
+
+def introsort(arr, pivot='last', seed=None):
+    return quick_sort(arr, pivot, introsort=True, seed=seed)
+
+
+register_algorithm(
+    'Quick Sort', quick_sort,
+    time='O(n log n)',
+    space='O(log n)',
+    best='O(n log n)',
+    stable='No',
+    description='''Quick Sort is a highly efficient divide-and-conquer algorithm. 
 It works by selecting a "pivot" element and partitioning the array so 
 that elements smaller than the pivot go to the left and larger elements 
 go to the right. This process is recursively applied to the sub-arrays.''',
-        'how_it_works': [
-            '1. Choose a pivot element (usually last)',
-            '2. Partition: smaller left, larger right',
-            '3. Pivot is now in final sorted position',
-            '4. Recursively apply to sub-arrays',
-            '5. Base case: size 0 or 1 already sorted'
-        ]
-    }
-}
+    how_it_works=[
+        '1. Choose a pivot element (usually last)',
+        '2. Partition: smaller left, larger right',
+        '3. Pivot is now in final sorted position',
+        '4. Recursively apply to sub-arrays',
+        '5. Base case: size 0 or 1 already sorted'
+    ],
+    options=('pivot', 'seed'),
+    expensive=True)
+
+
+register_algorithm(
+    'Quick Sort (3-way)', quick_sort_3way,
+    time='O(n log n)',
+    space='O(log n)',
+    best='O(n)',
+    stable='No',
+    description='''3-way Quick Sort partitions around the pivot into three parts: 
+smaller, equal and larger (Dijkstra's Dutch national flag). Every key 
+equal to the pivot is finished in a single pass, so arrays full of 
+duplicates - the worst case of the 2-way partition - sort quickly.''',
+    how_it_works=[
+        '1. Choose a pivot and move it to the front',
+        '2. Scan: smaller to the left, larger to the right',
+        '3. Keys equal to the pivot stay in the middle',
+        '4. The equal block is already in final position',
+        '5. Recurse on the smaller and larger parts'
+    ],
+    options=('pivot', 'seed'),
+    expensive=True)
+
+
+register_algorithm(
+    'Introsort', introsort,
+    time='O(n log n)',
+    space='O(log n)',
+    best='O(n log n)',
+    stable='No',
+    description='''Introsort (introspective sort) starts as Quick Sort but tracks the 
+recursion depth. When a partition nests deeper than about 2 log n, a 
+bad pivot sequence is suspected and that range is finished with Heap 
+Sort instead, which caps the worst case at O(n log n).''',
+    how_it_works=[
+        '1. Partition around a pivot like Quick Sort',
+        '2. Track the depth of every sub-array',
+        '3. Depth over 2 log n: switch to Heap Sort',
+        '4. Heap Sort finishes that range in O(k log k)',
+        '5. Other ranges keep using Quick Sort'
+    ],
+    options=('pivot', 'seed'))
+
+
+# Non-comparison and adaptive sorts. Counting and radix sort never compare
+# keys: OP_READ highlights the key being tallied and the output is built
+# in the aux buffer, then copied back. Timsort finds the runs already in
+# the input and merges them, galloping through long one-sided stretches.
+RADIX_BASE = 10
+# Ciura's experimentally tuned gaps, extended by a factor of 2.25
+SHELL_GAPS = (701, 301, 132, 57, 23, 10, 4, 1)
+# CPython uses 64; a smaller threshold keeps runs and merges visible on
+# arrays of a few dozen bars
+TIMSORT_MIN_MERGE = 16
+TIMSORT_MIN_GALLOP = 7
+
+
+def counting_sort(arr):
+    n = len(arr)
+    if n == 0:
+        return
+    low = min(arr)
+    counts = [0] * (max(arr) - low + 1)
+    yield (OP_STEP, 0, 0, (TEXT_KEY_RANGE, low, low + len(counts) - 1))
+    for i in range(n):
+        counts[arr[i] - low] += 1
+        yield (OP_READ, i, 0, (TEXT_COUNT, arr[i], counts[arr[i] - low]))
+        
+    # Prefix sums turn counts into the first output slot of every key;
+    # placing keys left to right keeps equal keys in input order
+    start = 0
+    for k in range(len(counts)):
+        counts[k], start = start, start + counts[k]
+    yield (OP_STEP, 0, 0, 'Prefix sums give every key its output slot')
+    aux = [None] * n
+    for i in range(n):
+        key = arr[i]
+        position = counts[key - low]
+        counts[key - low] += 1
+        aux[position] = key
+        yield (OP_AUX, position, key, (TEXT_PLACE, key, position))
+    for i in range(n):
+        yield (OP_WRITE, i, aux[i], (TEXT_COPY_BACK, aux[i], i))
+        arr[i] = aux[i]
+        
+    yield (OP_SORTED, 0, n, f'Sorting complete! {len(counts)} counters for {n} keys')
+
+
+def radix_sort(arr, base=RADIX_BASE):
+    # LSD radix sort: one stable counting pass per base-`base` digit of
+    # key - min, least significant digit first
+    n = len(arr)
+    if n == 0:
+        return
+    low = min(arr)
+    span = max(arr) - low
+    aux = [None] * n
+    place, passes = 1, 0
+    while True:
+        passes += 1
+        yield (OP_STEP, 0, 0, (TEXT_DIGIT_PASS, passes, place))
+        counts = [0] * base
+        for i in range(n):
+            digit = (arr[i] - low) // place % base
+            counts[digit] += 1
+            yield (OP_READ, i, 0, (TEXT_BUCKET, arr[i], digit))
+        start = 0
+        for d in range(base):
+            counts[d], start = start, start + counts[d]
+        for i in range(n):
+            key = arr[i]
+            digit = (key - low) // place % base
+            position = counts[digit]
+            counts[digit] += 1
+            aux[position] = key
+            yield (OP_AUX, position, key, (TEXT_PLACE, key, position))
+        for i in range(n):
+            yield (OP_WRITE, i, aux[i], None)
+            arr[i] = aux[i]
+        if span // place < base:
+            break
+        place *= base
+        
+    yield (OP_SORTED, 0, n, f'Sorting complete! {passes} pass(es) in base {base}')
+
+
+def heap_sort(arr):
+    yield from heap_sort_range(arr, 0, len(arr) - 1)
+    yield (OP_SORTED, 0, len(arr), 'Sorting complete!')
+
+
+def shell_gaps(n):
+    gaps = list(SHELL_GAPS)
+    while gaps[0] * 9 // 4 < n:
+        gaps.insert(0, gaps[0] * 9 // 4)
+    return [gap for gap in gaps if gap < n] or [1]
+
+
+def shell_sort(arr):
+    n = len(arr)
+    for gap in shell_gaps(n):
+        yield (OP_STEP, 0, 0, (TEXT_GAP, gap))
+        for i in range(gap, n):
+            key = arr[i]
+            j = i
+            while j >= gap:
+                yield (OP_COMPARE, j - gap, j, (TEXT_COMPARE_WITH, arr[j - gap], key))
+                if arr[j - gap] <= key:
+                    break
+                yield (OP_WRITE, j, arr[j - gap], (TEXT_SHIFT_BY, arr[j - gap], gap))
+                arr[j] = arr[j - gap]
+                j -= gap
+            if j != i:
+                yield (OP_WRITE, j, key, (TEXT_INSERT, key, j))
+                arr[j] = key
+                
+    yield (OP_SORTED, 0, n, 'Sorting complete!')
+
+
+def min_run_length(n):
+    # Timsort's minrun: n / minrun is a power of two or just below one, so
+    # the final merges stay balanced
+    r = 0
+    while n >= TIMSORT_MIN_MERGE:
+        r |= n & 1
+        n >>= 1
+    return n + r
+
+
+def timsort(arr):
+    # Runs live on a stack of (start, length) that is merged whenever the
+    # Timsort length invariants break. Merges copy the left run into the
+    # aux buffer; min_gallop adapts across merges like in CPython.
+    n = len(arr)
+    aux = [None] * n
+    minrun = min_run_length(n)
+    runs = []
+    min_gallop = TIMSORT_MIN_GALLOP
+    found = gallops = 0
+    
+    def gallop(seq, lo, hi, key, key_index, right, key_in_aux=False):
+        # How many of the sorted seq[lo:hi] go before key (<= key when
+        # right, < key otherwise): probe offsets 1, 3, 7, ... then bisect.
+        # Either seq or the key may sit in aux, which the probe events show.
+        def before(value):
+            return value <= key if right else value < key
+            
+        def probe(i):
+            if key_in_aux:
+                return (OP_AUX_COMPARE, key_index, i, (TEXT_GALLOP, seq[i], key))
+            return (OP_AUX_COMPARE if seq is aux else OP_COMPARE, i, key_index,
+                    (TEXT_GALLOP, seq[i], key))
+            
+        last, offset = 0, 1
+        while offset <= hi - lo:
+            yield probe(lo + offset - 1)
+            if not before(seq[lo + offset - 1]):
+                break
+            last, offset = offset, 2 * offset + 1
+        a, b = last, min(offset - 1, hi - lo)
+        while a < b:
+            m = (a + b) // 2
+            yield probe(lo + m)
+            if before(seq[lo + m]):
+                a = m + 1
+            else:
+                b = m
+        return a
+        
+    def count_run(lo):
+        # End of the run starting at lo; strictly descending runs are
+        # reversed in place, which keeps the sort stable
+        hi = lo + 1
+        if hi == n:
+            return hi
+        yield (OP_COMPARE, lo, hi, (TEXT_RUN_START, lo))
+        descending = arr[hi] < arr[lo]
+        hi += 1
+        while hi < n:
+            yield (OP_COMPARE, hi - 1, hi, None)
+            if (arr[hi] < arr[hi - 1]) != descending:
+                break
+            hi += 1
+        if descending:
+            yield (OP_STEP, 0, 0, (TEXT_REVERSE_RUN, lo, hi - 1))
+            i, j = lo, hi - 1
+            while i < j:
+                yield (OP_SWAP, i, j, None)
+                arr[i], arr[j] = arr[j], arr[i]
+                i += 1
+                j -= 1
+        return hi
+        
+    def binary_insertion(lo, start, hi):
+        # Grows the sorted arr[lo:start] over arr[start:hi]
+        for i in range(start, hi):
+            key = arr[i]
+            a, b = lo, i
+            while a < b:
+                m = (a + b) // 2
+                yield (OP_COMPARE, m, i, (TEXT_BINARY_SEARCH, key, arr[m]))
+                if key < arr[m]:
+                    b = m
+                else:
+                    a = m + 1
+            for j in range(i, a, -1):
+                yield (OP_WRITE, j, arr[j - 1], None)
+                arr[j] = arr[j - 1]
+            if a != i:
+                yield (OP_WRITE, a, key, (TEXT_INSERT, key, a))
+                arr[a] = key
+                
+    def merge_lo(lo, mid, hi):
+        nonlocal min_gallop, gallops
+        for i in range(lo, mid):
+            aux[i] = arr[i]
+            yield (OP_AUX, i, aux[i], None)
+        i, j, k = lo, mid, lo
+        while i < mid and j < hi:
+            # One element at a time until one run wins min_gallop times in a row
+            wins_a = wins_b = 0
+            while i < mid and j < hi and max(wins_a, wins_b) < min_gallop:
+                yield (OP_AUX_COMPARE, i, j, (TEXT_COMPARE, aux[i], arr[j]))
+                if arr[j] < aux[i]:
+                    yield (OP_WRITE, k, arr[j], None)
+                    arr[k] = arr[j]
+                    j += 1
+                    wins_a, wins_b = 0, wins_b + 1
+                else:
+                    yield (OP_WRITE, k, aux[i], None)
+                    arr[k] = aux[i]
+                    i += 1
+                    wins_a, wins_b = wins_a + 1, 0
+                k += 1
+                
+            # Galloping: copy whole stretches found by exponential search
+            while i < mid and j < hi:
+                gallops += 1
+                count_a = yield from gallop(aux, i, mid, arr[j], j, True)
+                if count_a:
+                    yield (OP_STEP, 0, 0, (TEXT_GALLOP_LEFT, count_a))
+                for _ in range(count_a):
+                    yield (OP_WRITE, k, aux[i], None)
+                    arr[k] = aux[i]
+                    i += 1
+                    k += 1
+                if i == mid:
+                    break
+                count_b = yield from gallop(arr, j, hi, aux[i], i, False, key_in_aux=True)
+                yield (OP_STEP, 0, 0, (TEXT_GALLOP_RIGHT, count_b))
+                for _ in range(count_b):
+                    yield (OP_WRITE, k, arr[j], None)
+                    arr[k] = arr[j]
+                    j += 1
+                    k += 1
+                if count_a < TIMSORT_MIN_GALLOP and count_b < TIMSORT_MIN_GALLOP:
+                    min_gallop += 1
+                    break
+                min_gallop = max(1, min_gallop - 1)
+                
+        # What is left of the right run is already in place
+        while i < mid:
+            yield (OP_WRITE, k, aux[i], None)
+            arr[k] = aux[i]
+            i += 1
+            k += 1
+            
+    def merge_at(r):
+        lo, length = runs[r]
+        mid, length_b = runs[r + 1]
+        hi = mid + length_b
+        runs[r] = (lo, length + length_b)
+        del runs[r + 1]
+        yield (OP_STEP, 0, 0, (TEXT_MERGE_RUNS, mid - lo, hi - mid))
+        # Keys of the left run <= its right neighbour's first key, and keys
+        # of the right run >= the left run's last key, are already in place
+        lo += yield from gallop(arr, lo, mid, arr[mid], mid, True)
+        if lo == mid:
+            return
+        hi = mid + (yield from gallop(arr, mid, hi, arr[mid - 1], mid - 1, False))
+        yield from merge_lo(lo, mid, hi)
+        
+    def merge_collapse():
+        while len(runs) > 1:
+            r = len(runs) - 2
+            if ((r > 0 and runs[r - 1][1] <= runs[r][1] + runs[r + 1][1])
+                    or (r > 1 and runs[r - 2][1] <= runs[r - 1][1] + runs[r][1])):
+                if runs[r - 1][1] < runs[r + 1][1]:
+                    r -= 1
+            elif runs[r][1] > runs[r + 1][1]:
+                break
+            yield from merge_at(r)
+            
+    lo = 0
+    while lo < n:
+        hi = yield from count_run(lo)
+        found += 1
+        if hi - lo < minrun:
+            end = min(lo + minrun, n)
+            yield (OP_STEP, 0, 0, (TEXT_SHORT_RUN, lo, end - 1))
+            yield from binary_insertion(lo, hi, end)
+            hi = end
+        runs.append((lo, hi - lo))
+        yield from merge_collapse()
+        lo = hi
+    while len(runs) > 1:
+        r = len(runs) - 2
+        if r > 0 and runs[r - 1][1] < runs[r + 1][1]:
+            r -= 1
+        yield from merge_at(r)
+        
+    yield (OP_SORTED, 0, n, f'Sorting complete! {found} natural run(s), {gallops} gallop(s)')
+
+
+register_algorithm(
+    'Counting Sort', counting_sort,
+    time='O(n + k)',
+    space='O(n + k)',
+    best='O(n + k)',
+    stable='Yes',
+    description='''Counting Sort never compares keys. It counts how often each of the 
+k possible keys occurs, turns the counts into starting positions with a 
+prefix sum, and places every key straight into its slot in an output 
+buffer. It wins whenever the key range k is small next to n.''',
+    how_it_works=[
+        '1. Count the occurrences of every key',
+        '2. Prefix sums give each key its first slot',
+        '3. Place keys left to right into the buffer',
+        '4. Equal keys keep their input order',
+        '5. Copy the buffer back over the array'
+    ])
+
+register_algorithm(
+    'Radix Sort (LSD)', radix_sort,
+    time='O(d(n+b))',
+    space='O(n + b)',
+    best='O(d(n+b))',
+    stable='Yes',
+    description='''LSD Radix Sort runs a stable counting pass on each base-10 digit, 
+least significant digit first. Because every pass is stable, keys tied 
+on the current digit stay ordered by the digits already processed, so 
+after d passes (one per digit of the largest key) the array is sorted.''',
+    how_it_works=[
+        '1. Take the least significant digit',
+        '2. Count keys per digit value (b buckets)',
+        '3. Distribute keys stably into the buffer',
+        '4. Copy back and move to the next digit',
+        '5. Done after the most significant digit'
+    ])
+
+register_algorithm(
+    'Heap Sort', heap_sort,
+    time='O(n log n)',
+    space='O(1)',
+    best='O(n log n)',
+    stable='No',
+    description='''Heap Sort arranges the array as a binary max-heap, where every 
+parent is at least as large as its children. It then repeatedly swaps 
+the root - the largest remaining key - to the end of the array and 
+sifts the new root down to restore the heap, entirely in place.''',
+    how_it_works=[
+        '1. Sift down every parent to build a max-heap',
+        '2. Swap the root with the last heap element',
+        '3. That element is now in final position',
+        '4. Sift the new root down to fix the heap',
+        '5. Repeat on the shrinking heap'
+    ])
+
+register_algorithm(
+    'Shell Sort', shell_sort,
+    time='O(n^1.3)',
+    space='O(1)',
+    best='O(n log n)',
+    stable='No',
+    description='''Shell Sort runs insertion sort on elements a gap apart, shrinking the 
+gap each pass down to 1. Far-apart passes move keys long distances 
+cheaply, so the final plain insertion sort sees a nearly sorted array. 
+With Ciura's gaps it runs in about n^1.3 time; no tight bound is known.''',
+    how_it_works=[
+        '1. Pick the largest gap below n',
+        '2. Insertion sort each gap-spaced sequence',
+        '3. Shrink the gap (701, 301, ..., 4, 1)',
+        '4. Each pass leaves less work for the next',
+        '5. The gap-1 pass finishes the sort'
+    ],
+    expensive=True)
+
+register_algorithm(
+    'Timsort', timsort,
+    time='O(n log n)',
+    space='O(n)',
+    best='O(n)',
+    stable='Yes',
+    description='''Timsort scans for runs that are already sorted (reversing strictly 
+descending ones), extends short runs with binary insertion, and merges 
+them from a stack that keeps merges balanced. When one run keeps 
+winning, merging switches to galloping and copies whole stretches.''',
+    how_it_works=[
+        '1. Find the next natural run, reverse if needed',
+        '2. Extend short runs to minrun by insertion',
+        '3. Push the run and merge to keep stack balanced',
+        '4. Gallop when one side wins 7 times in a row',
+        '5. Merge the remaining runs at the end'
+    ])
+
+
+# Parallel sorts. The keys live in two shared-memory NumPy buffers that
+# every pool process attaches to once. A sort is planned as a sequence of
+# phases, each a batch of tasks on disjoint index ranges that reads one
+# buffer and writes either the same ranges or the other buffer, so no task
+# reads what another one writes. The generator runs each phase on the pool
+# for real and then replays its result as step events: OP_WORKER tints
+# every element with the worker that produced it, then OP_WRITE sets it.
+# Task functions return (worker id, result); the ids number the pool
+# processes 0..p-1 in the order they start.
+SAMPLE_OVERSAMPLING = 8
+_parallel_buffers = None
+_parallel_worker = None
+
+
+def _init_parallel_worker(names, n, ready, counter):
+    global _parallel_buffers, _parallel_worker
+    from multiprocessing import shared_memory
+    
+    blocks = [shared_memory.SharedMemory(name=name) for name in names]
+    # The blocks are kept so their memory stays mapped
+    _parallel_buffers = (blocks, [np.ndarray(n, np.int64, buffer=block.buf) for block in blocks])
+    with counter.get_lock():
+        _parallel_worker = counter.value
+        counter.value += 1
+    ready.wait()
+
+
+def _sort_range(src, lo, hi):
+    _parallel_buffers[1][src][lo:hi].sort()
+    return _parallel_worker, None
+
+
+def _merge_ranges(src, i0, i1, j0, j1, k0):
+    # Stable merge of src[i0:i1] and src[j0:j1] into the other buffer at k0
+    views = _parallel_buffers[1]
+    left = views[src][i0:i1]
+    right = views[src][j0:j1]
+    out = views[1 - src][k0:k0 + len(left) + len(right)]
+    positions = np.searchsorted(left, right, side='right') + np.arange(len(right))
+    from_right = np.zeros(len(out), dtype=bool)
+    from_right[positions] = True
+    out[positions] = right
+    out[~from_right] = left
+    return _parallel_worker, None
+
+
+def _bucket_counts(src, lo, hi, splitters):
+    buckets = np.searchsorted(splitters, _parallel_buffers[1][src][lo:hi], side='right')
+    return _parallel_worker, np.bincount(buckets, minlength=len(splitters) + 1)
+
+
+def _scatter_buckets(src, lo, hi, splitters, offsets):
+    # Moves src[lo:hi] into the other buffer, each key to its bucket's slot
+    # for this chunk
+    views = _parallel_buffers[1]
+    chunk = views[src][lo:hi]
+    buckets = np.searchsorted(splitters, chunk, side='right')
+    grouped = chunk[np.argsort(buckets, kind='stable')]
+    start = 0
+    for bucket, count in enumerate(np.bincount(buckets, minlength=len(offsets)).tolist()):
+        views[1 - src][offsets[bucket]:offsets[bucket] + count] = grouped[start:start + count]
+        start += count
+    return _parallel_worker, None
+
+
+def merge_path_split(left, right, d):
+    # How many of the first d keys of the stable merge of left and right
+    # come from left, by binary search along the merge path
+    lo, hi = max(0, d - len(right)), min(d, len(left))
+    while lo < hi:
+        i = (lo + hi) // 2
+        if left[i] <= right[d - i - 1]:
+            lo = i + 1
+        else:
+            hi = i
+    return lo
+
+
+def _parallel_merge_plan(views, n, workers, rng):
+    # Phases are (text, task function, task args, buffer written, ranges)
+    # where ranges holds every task's (lo, hi) output ranges to replay
+    bounds = [n * w // workers for w in range(workers + 1)]
+    runs = list(zip(bounds, bounds[1:]))
+    yield (f'{workers} worker(s) sort {n // workers}+ keys each', _sort_range,
+           [(0, lo, hi) for lo, hi in runs], 0, [[run] for run in runs])
+    src = 0
+    while len(runs) > 1:
+        # Every pair of runs is cut along its merge path so that all the
+        # workers share each round, the last single merge included
+        parts = max(1, workers // (len(runs) // 2))
+        tasks = []
+        ranges = []
+        merged = []
+        for r in range(0, len(runs), 2):
+            lo, mid = runs[r]
+            hi = runs[r + 1][1] if r + 1 < len(runs) else mid
+            left, right = views[src][lo:mid], views[src][mid:hi]
+            cuts = [lo + (hi - lo) * t // parts for t in range(parts + 1)]
+            taken = [merge_path_split(left, right, k - lo) for k in cuts]
+            for t in range(parts):
+                tasks.append((src, lo + taken[t], lo + taken[t + 1],
+                              mid + cuts[t] - lo - taken[t], mid + cuts[t + 1] - lo - taken[t + 1],
+                              cuts[t]))
+                ranges.append([(cuts[t], cuts[t + 1])])
+            merged.append((lo, hi))
+        yield (f'{len(tasks)} task(s) merge {len(runs)} runs into {len(merged)}',
+               _merge_ranges, tasks, 1 - src, ranges)
+        runs = merged
+        src = 1 - src
+
+
+def _sample_sort_plan(views, n, workers, rng):
+    bounds = [n * w // workers for w in range(workers + 1)]
+    chunks = list(zip(bounds, bounds[1:]))
+    sample = np.sort(rng.choice(views[0], size=min(n, workers * SAMPLE_OVERSAMPLING),
+                                replace=False))
+    splitters = sample[[len(sample) * b // workers for b in range(1, workers)]]
+    counts = yield (f'Sampled {len(sample)} keys for {workers - 1} splitters, counting buckets',
+                    _bucket_counts, [(0, lo, hi, splitters) for lo, hi in chunks], 0,
+                    [[] for _ in chunks])
+    counts = np.array(counts)
+    totals = counts.sum(axis=0)
+    starts = np.cumsum(totals) - totals
+    offsets = starts + np.cumsum(counts, axis=0) - counts
+    buckets = [(int(start), int(start + total)) for start, total in zip(starts, totals)]
+    yield (f'{workers} worker(s) scatter keys into buckets', _scatter_buckets,
+           [(0, lo, hi, splitters, offsets[c]) for c, (lo, hi) in enumerate(chunks)], 1,
+           [[(int(offset), int(offset + count)) for offset, count in zip(offsets[c], counts[c])]
+            for c in range(len(chunks))])
+    yield (f'Workers sort buckets of {min(totals)}..{max(totals)} keys', _sort_range,
+           [(1, lo, hi) for lo, hi in buckets], 1, [[bucket] for bucket in buckets])
+
+
+def parallel_sort(arr, method='merge', workers=None, seed=None, visual=True, stats=None):
+    # Sorts arr on a process pool. With visual=False only the phase steps
+    # are yielded, for timing; `stats` receives the measured times.
+    from multiprocessing import shared_memory
+    
+    n = len(arr)
+    workers = max(1, min(workers or os.cpu_count() or 1, n))
+    data = np.array(arr, dtype=np.int64)
+    start = time.perf_counter()
+    np.sort(data)
+    serial = time.perf_counter() - start
+    plan = _parallel_merge_plan if method == 'merge' else _sample_sort_plan
+    
+    blocks = [shared_memory.SharedMemory(create=True, size=max(1, data.nbytes))
+              for _ in range(2)]
+    views = view = phases = None
+    try:
+        views = [np.ndarray(n, np.int64, buffer=block.buf) for block in blocks]
+        views[0][:] = data
+        # spawn, because the generator may be running on a StepProducer thread
+        context = multiprocessing.get_context('spawn')
+        # Timing starts once every worker is up, so it leaves out startup
+        ready = context.Barrier(workers + 1)
+        initargs = ([block.name for block in blocks], n, ready, context.Value('i', 0))
+        with context.Pool(workers, _init_parallel_worker, initargs) as pool:
+            ready.wait()
+            parallel = 0.0
+            phases = plan(views, n, workers, np.random.default_rng(seed))
+            results = None
+            while True:
+                try:
+                    text, function, tasks, dst, ranges = phases.send(results)
+                except StopIteration:
+                    break
+                yield (OP_STEP, 0, 0, text)
+                start = time.perf_counter()
+                done = pool.starmap(function, tasks)
+                parallel += time.perf_counter() - start
+                results = [result for _, result in done]
+                if visual:
+                    view = views[dst]
+                    for (worker, _), task_ranges in zip(done, ranges):
+                        for lo, hi in task_ranges:
+                            for i in range(lo, hi):
+                                yield (OP_WORKER, i, worker, None)
+                                yield (OP_WRITE, i, int(view[i]), None)
+        arr[:] = views[dst].tolist()
+    finally:
+        # Views into the blocks must be gone before they can be closed
+        if phases is not None:
+            phases.close()
+        views = view = phases = None
+        for block in blocks:
+            block.close()
+            block.unlink()
+            
+    speedup = serial / parallel if parallel else 0.0
+    if stats is not None:
+        stats.update(workers=workers, serial_seconds=serial, parallel_seconds=parallel,
+                     speedup=speedup)
+    yield (OP_SORTED, 0, n, f'Sorting complete! {workers} worker(s) {parallel * 1000:.1f} ms, '
+                            f'1 core {serial * 1000:.1f} ms: speedup x{speedup:.2f}')
+    
+    
+def parallel_merge_sort(arr, workers=None, seed=None):
+    return parallel_sort(arr, 'merge', workers, seed)
+    
+    
+def sample_sort(arr, workers=None, seed=None):
+    return parallel_sort(arr, 'sample', workers, seed)
+    
+    
+register_algorithm(
+    'Parallel Merge Sort', parallel_merge_sort,
+    time='O(n log n)',
+    space='O(n)',
+    best='O(n log n)',
+    stable='Yes',
+    description='''Parallel Merge Sort splits the array into one segment per CPU core 
+and sorts the segments at the same time in separate processes. Sorted 
+runs are then merged pairwise; each merge is cut along its merge path 
+so all p workers stay busy, even in the final merge, for O(n log n / p) 
+time per core.''',
+    how_it_works=[
+        '1. Split the array into p segments',
+        '2. Each worker process sorts one segment',
+        '3. Cut each merge into p equal output parts',
+        '4. Workers merge their parts in parallel',
+        '5. Repeat until a single run is left'
+    ],
+    options=('seed',),
+    in_process=False)
+
+
+register_algorithm(
+    'Sample Sort', sample_sort,
+    time='O(n log n)',
+    space='O(n)',
+    best='O(n log n)',
+    stable='No',
+    description='''Sample Sort generalizes Quick Sort to p workers. A random sample 
+picks p - 1 splitters that cut the key range into p buckets. Workers 
+scatter their chunk of the input into the buckets, then each worker 
+sorts one bucket, and the buckets are already in order.''',
+    how_it_works=[
+        '1. Sample keys and choose p - 1 splitters',
+        '2. Workers count keys per bucket',
+        '3. Workers scatter keys into the buckets',
+        '4. Each worker sorts its own bucket',
+        '5. Concatenated buckets are sorted'
+    ],
+    options=('seed',),
+    in_process=False)
+
+
+# Registry name -> parallel_sort() method
+PARALLEL_METHODS = {'Parallel Merge Sort': 'merge', 'Sample Sort': 'sample'}
+
+
+def measure_speedup(method='merge', n=1000000, worker_counts=None, seed=0):
+    # Time of the parallel phases against a single-core np.sort of the
+    # same input, for each worker count (powers of two up to the cores)
+    cores = os.cpu_count() or 1
+    if worker_counts is None:
+        worker_counts = [1 << k for k in range(cores.bit_length()) if 1 << k <= cores]
+        if worker_counts[-1] != cores:
+            worker_counts.append(cores)
+    array = generate_input('uniform', n, seed, high=2 ** 31 - 1).tolist()
+    rows = []
+    for workers in worker_counts:
+        stats = {}
+        for _ in parallel_sort(list(array), method, workers, seed, visual=False, stats=stats):
+            pass
+        rows.append(stats)
+    return rows
+
+
+# External sort. Keys are little-endian int64 in a plain file, read and
+# written through np.memmap so at most `memory_budget` bytes of keys are in
+# memory at once. Pass 0 sorts budget-sized chunks into runs; every later
+# pass merges up to `fan_in` runs at a time. The merge is heap-driven at
+# block granularity: the heap orders the runs by the last key of their
+# buffered block, everything up to the smallest such key can be emitted at
+# once, and the run(s) that key came from are refilled. Events work on
+# blocks rather than keys: element i of the display is block i of the
+# file, drawn at its first key and tinted by the run it belongs to.
+EXTERNAL_DTYPE = np.dtype('<i8')
+
+
+def write_external_input(path, n, seed=None, low=10, high=100, chunk=1 << 20):
+    # Uniform random keys, generated chunk by chunk so n may exceed RAM
+    rng = np.random.default_rng(seed)
+    with open(path, 'wb') as f:
+        for start in range(0, n, chunk):
+            f.write(rng.integers(low, high, size=min(chunk, n - start), dtype=EXTERNAL_DTYPE)
+                    .tobytes())
+
+
+def external_blocks(path, block_bytes):
+    # First key of every block of the file, the initial display array
+    keys = np.memmap(path, dtype=EXTERNAL_DTYPE, mode='r') if os.path.getsize(path) else []
+    return np.array(keys[::block_bytes // EXTERNAL_DTYPE.itemsize]).tolist()
+
+
+def external_passes(n, memory_budget, block_bytes, fan_in=None):
+    # Theoretical pass count: run formation plus ceil(log_k(runs)) merges
+    budget = memory_budget // EXTERNAL_DTYPE.itemsize
+    block = block_bytes // EXTERNAL_DTYPE.itemsize
+    fan_in = fan_in or max(2, budget // block - 1)
+    runs = max(1, -(-n // (budget // block * block)))
+    return 1 + (math.ceil(math.log(runs, fan_in)) if runs > 1 else 0)
+
+
+def merge_takes(buffers, cutoff, room):
+    # How many keys to take from the front of each sorted buffer so that
+    # the taken keys are the smallest min(room, keys <= cutoff) of them all.
+    # Ties at the threshold are taken from the buffers in order.
+    takes = {r: int(np.searchsorted(buffer, cutoff, side='right'))
+             for r, buffer in buffers.items()}
+    if sum(takes.values()) <= room:
+        return takes
+    # Smallest threshold t with at least `room` keys <= t
+    lo = min(int(buffer[0]) for buffer in buffers.values() if len(buffer))
+    hi = cutoff
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if sum(int(np.searchsorted(buffer, mid, side='right'))
+               for buffer in buffers.values()) >= room:
+            hi = mid
+        else:
+            lo = mid + 1
+    takes = {r: int(np.searchsorted(buffer, lo, side='left')) for r, buffer in buffers.items()}
+    short = room - sum(takes.values())
+    for r, buffer in buffers.items():
+        extra = min(short, int(np.searchsorted(buffer, lo, side='right')) - takes[r])
+        takes[r] += extra
+        short -= extra
+    return takes
+
+
+def external_sort(path, out_path=None, memory_budget=64 << 20, block_bytes=1 << 20,
+                  fan_in=None, visual=True, stats=None):
+    # Sorts the keys in `path` into out_path; with out_path None the result
+    # is only shown and the output file is removed. Merges are k-way
+    # through a single output block, and the fan-in defaults to the input
+    # blocks that fit the budget next to it.
+    block = block_bytes // EXTERNAL_DTYPE.itemsize
+    budget = memory_budget // EXTERNAL_DTYPE.itemsize // block * block
+    if block < 1 or budget < 3 * block:
+        raise ValueError('memory_budget must hold at least three blocks')
+    fan_in = fan_in or budget // block - 1
+    size = os.path.getsize(path)
+    if size % EXTERNAL_DTYPE.itemsize:
+        raise ValueError(f'{path} is not a whole number of int64 keys')
+    n = size // EXTERNAL_DTYPE.itemsize
+    blocks = -(-n // block)
+    theory = external_passes(n, memory_budget, block_bytes, fan_in)
+    passes = []
+    
+    directory = os.path.dirname(os.path.abspath(out_path or path))
+    scratch = []
+    for _ in range(3 if out_path is None else 2):
+        fd, name = tempfile.mkstemp(suffix='.run', dir=directory)
+        os.close(fd)
+        scratch.append(name)
+    target = out_path or scratch.pop()
+    source = run_file = None
+    try:
+        if n == 0:
+            open(target, 'wb').close()
+            if stats is not None:
+                stats.update(keys=0, blocks=0, fan_in=fan_in, runs=0, passes=[],
+                             theoretical_passes=0)
+            yield (OP_SORTED, 0, 0, 'Sorting complete! Empty input')
+            return
+            
+        def blocks_written(dst, first, last, run):
+            # Display events for blocks [first, last) of a finished range
+            for b in range(first, last):
+                yield (OP_WORKER, b, run, None)
+                yield (OP_WRITE, b, int(dst[b * block]), None)
+                
+        # Pass 0: run formation
+        source = np.memmap(path, dtype=EXTERNAL_DTYPE, mode='r')
+        runs = [(start, min(start + budget, n)) for start in range(0, n, budget)]
+        output = target if len(runs) == 1 else scratch[0]
+        run_file = np.memmap(output, dtype=EXTERNAL_DTYPE, mode='w+', shape=(n,))
+        start_time = time.perf_counter()
+        for r, (lo, hi) in enumerate(runs):
+            yield (OP_STEP, 0, 0, f'Pass 1: sorting run {r + 1}/{len(runs)} in memory')
+            chunk = np.array(source[lo:hi])
+            chunk.sort()
+            run_file[lo:hi] = chunk
+            del chunk
+            if visual:
+                yield from blocks_written(run_file, lo // block, -(-hi // block), r)
+        run_file.flush()
+        passes.append({'pass': 1, 'runs': len(runs), 'bytes_read': n * EXTERNAL_DTYPE.itemsize,
+                       'bytes_written': n * EXTERNAL_DTYPE.itemsize,
+                       'seconds': time.perf_counter() - start_time})
+        
+        # Merge passes, alternating between two scratch files
+        spare = scratch[1]
+        while len(runs) > 1:
+            number = len(passes) + 1
+            groups = [runs[g:g + fan_in] for g in range(0, len(runs), fan_in)]
+            output = target if len(groups) == 1 else spare
+            spare = run_file.filename
+            source, run_file = run_file, None
+            run_file = np.memmap(output, dtype=EXTERNAL_DTYPE, mode='w+', shape=(n,))
+            read = written = 0
+            start_time = time.perf_counter()
+            for g, group in enumerate(groups):
+                yield (OP_STEP, 0, 0, f'Pass {number}: merging runs {g * fan_in + 1}-'
+                                      f'{g * fan_in + len(group)} of {len(runs)} '
+                                      f'(fan-in {len(group)})')
+                # One input block per run, a heap of their last keys, and
+                # one output block that is flushed whenever it fills up
+                buffers = {}
+                cursors = {}
+                heap = []
+                for r, (lo, hi) in enumerate(group):
+                    buffers[r] = np.array(source[lo:min(lo + block, hi)])
+                    cursors[r] = min(lo + block, hi)
+                    read += buffers[r].nbytes
+                    heap.append((int(buffers[r][-1]), r))
+                heapq.heapify(heap)
+                out = np.empty(block, dtype=EXTERNAL_DTYPE)
+                filled = 0
+                position = group[0][0]
+                shown = position // block
+                while heap:
+                    # Keys up to the smallest last key can go out: every key
+                    # still on disk is at least as large
+                    takes = merge_takes(buffers, heap[0][0], block - filled)
+                    start = filled
+                    for r, k in takes.items():
+                        out[filled:filled + k] = buffers[r][:k]
+                        buffers[r] = buffers[r][k:]
+                        filled += k
+                    out[start:filled].sort()
+                    # Refill the runs whose block is used up
+                    while heap and not len(buffers[heap[0][1]]):
+                        r = heapq.heappop(heap)[1]
+                        del buffers[r]
+                        lo, hi = cursors[r], group[r][1]
+                        if lo < hi:
+                            buffers[r] = np.array(source[lo:min(lo + block, hi)])
+                            cursors[r] = min(lo + block, hi)
+                            read += buffers[r].nbytes
+                            heapq.heappush(heap, (int(buffers[r][-1]), r))
+                    if filled == block or not heap:
+                        run_file[position:position + filled] = out[:filled]
+                        written += out[:filled].nbytes
+                        position += filled
+                        filled = 0
+                        if visual:
+                            done = position // block if heap else -(-position // block)
+                            yield from blocks_written(run_file, shown, done, g)
+                            shown = done
+            run_file.flush()
+            runs = [(group[0][0], group[-1][1]) for group in groups]
+            passes.append({'pass': number, 'runs': len(runs), 'bytes_read': read,
+                           'bytes_written': written, 'seconds': time.perf_counter() - start_time})
+            yield (OP_STEP, 0, 0, f'Pass {number} done: {read / 2 ** 20:.1f} MiB read, '
+                                  f'{written / 2 ** 20:.1f} MiB written, {len(runs)} run(s) left')
+    finally:
+        source = run_file = None
+        for name in scratch:
+            if os.path.exists(name):
+                os.remove(name)
+        if out_path is None and os.path.exists(target):
+            os.remove(target)
+            
+    if stats is not None:
+        stats.update(keys=n, blocks=blocks, fan_in=fan_in, runs=passes[0]['runs'],
+                     passes=passes, theoretical_passes=theory)
+    total = sum(p['bytes_read'] + p['bytes_written'] for p in passes)
+    yield (OP_SORTED, 0, blocks, f'Sorting complete! {len(passes)} passes (theory {theory}), '
+                                 f'{total / 2 ** 20:.1f} MiB of I/O')
+
+
+register_algorithm(
+    'External Sort', external_sort,
+    time='O(n log n)',
+    space='O(M)',
+    best='O(n log n)',
+    stable='No',
+    description='''External Sort handles files bigger than memory M. Chunks that fit 
+in M are sorted into runs on disk, then k runs at a time are merged 
+with a heap until one run is left, for 1 + ceil(log_k(n / M)) passes 
+over the file. Each bar here is a disk block, not a key.''',
+    how_it_works=[
+        '1. Read M bytes, sort them, write a run',
+        '2. Repeat until the file is all runs',
+        '3. Merge k runs, one buffered block each',
+        '4. A heap picks the next block to read',
+        '5. Repeat passes until one run is left'
+    ],
+    in_memory=False,
+    in_process=False)
+
+
+# Binary step traces. Layout (little endian):
+#   header   magic, version, reserved, n, step count, text table offset
+#   array    n int32 values of the input
+#   records  one fixed-width 21-byte record per event (op, a, b, text id,
+#            two template args)
+#   texts    uint32 count, then uint32 length + UTF-8 bytes per template
+# A record stores its step text as an encode_step() template id (-1 for
+# None) and args, so the text table holds only the distinct templates and
+# the file stays small for multi-million-step runs.
+TRACE_MAGIC = b'SVTR'
+TRACE_VERSION = 2
+TRACE_HEADER = struct.Struct('<4sHHIQQ')
+TRACE_RECORD = struct.Struct('<Biiiii')
+TRACE_DTYPE = np.dtype([('op', 'u1'), ('a', '<i4'), ('b', '<i4'), ('text', '<i4'),
+                        ('x', '<i4'), ('y', '<i4')])
+TRACE_CHUNK = 65536
+
+
+class TraceWriter:
+    def __init__(self, path, array):
+        self.file = open(path, 'wb')
+        self.n = len(array)
+        self.steps = 0
+        # STEP_TEMPLATES id or literal template -> id in this file's text table
+        self.templates = {}
+        self.buffer = bytearray()
+        self.file.write(TRACE_HEADER.pack(TRACE_MAGIC, TRACE_VERSION, 0, self.n, 0, 0))
+        self.file.write(np.asarray(array, dtype='<i4').tobytes())
+        
+    def write(self, event):
+        op, a, b, text = event
+        if text is None:
+            self.buffer += TRACE_RECORD.pack(op, a, b, -1, 0, 0)
+        else:
+            text_id, x, y = encode_step(text)
+            local_id = self.templates.get(text_id)
+            if local_id is None:
+                local_id = self.templates[text_id] = len(self.templates)
+            self.buffer += TRACE_RECORD.pack(op, a, b, local_id, x, y)
+        self.steps += 1
+        if len(self.buffer) >= TRACE_CHUNK * TRACE_RECORD.size:
+            self.file.write(self.buffer)
+            self.buffer.clear()
+            
+    def close(self):
+        self.file.write(self.buffer)
+        self.buffer.clear()
+        texts_offset = self.file.tell()
+        self.file.write(struct.pack('<I', len(self.templates)))
+        for template in self.templates:
+            if template.__class__ is int:
+                template = STEP_TEMPLATES[template]
+            data = template.encode('utf-8')
+            self.file.write(struct.pack('<I', len(data)))
+            self.file.write(data)
+        self.file.seek(0)
+        self.file.write(TRACE_HEADER.pack(TRACE_MAGIC, TRACE_VERSION, 0,
+                                          self.n, self.steps, texts_offset))
+        self.file.close()
+        
+    def __enter__(self):
+        return self
+        
+    def __exit__(self, *exc):
+        self.close()
+
+
+class TraceReader:
+    # Memory-maps a trace; records are decoded chunk by chunk while iterating
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            magic, version, _, n, steps, texts_offset = TRACE_HEADER.unpack(
+                f.read(TRACE_HEADER.size))
+            if magic != TRACE_MAGIC or version != TRACE_VERSION:
+                raise ValueError(f'{path} is not a version {TRACE_VERSION} sort trace')
+            f.seek(texts_offset)
+            (count,) = struct.unpack('<I', f.read(4))
+            self.texts = []
+            for _ in range(count):
+                (length,) = struct.unpack('<I', f.read(4))
+                self.texts.append(f.read(length).decode('utf-8'))
+        # Texts without fields are yielded as plain strings, so only real
+        # templates get interned
+        self.template_ids = []
+        for text in self.texts:
+            try:
+                self.template_ids.append(text.format())
+            except (IndexError, KeyError):
+                self.template_ids.append(step_template(text))
+        self.n = n
+        self.steps = steps
+        records_offset = TRACE_HEADER.size + 4 * n
+        if n:
+            self.array = np.memmap(path, dtype='<i4', mode='r',
+                                   offset=TRACE_HEADER.size, shape=(n,))
+        else:
+            self.array = np.zeros(0, dtype='<i4')
+        if steps:
+            self.records = np.memmap(path, dtype=TRACE_DTYPE, mode='r',
+                                     offset=records_offset, shape=(steps,))
+        else:
+            self.records = np.zeros(0, dtype=TRACE_DTYPE)
+            
+    def __len__(self):
+        return self.steps
+        
+    def events(self, start=0):
+        template_ids = self.template_ids
+        records = self.records
+        for lo in range(start, self.steps, TRACE_CHUNK):
+            chunk = records[lo:lo + TRACE_CHUNK]
+            for op, a, b, text_id, x, y in zip(chunk['op'].tolist(), chunk['a'].tolist(),
+                                               chunk['b'].tolist(), chunk['text'].tolist(),
+                                               chunk['x'].tolist(), chunk['y'].tolist()):
+                if text_id < 0:
+                    text = None
+                else:
+                    text = template_ids[text_id]
+                    if text.__class__ is int:
+                        text = (text, x, y)
+                yield (op, a, b, text)
+
+
+def record_trace(name, array, path):
+    # Runs an algorithm headless and writes its full step trace to path
+    with TraceWriter(path, array) as writer:
+        for event in sort_generators[name](list(array)):
+            writer.write(event)
+    return writer.steps
+
+
+class StepProducer:
+    # Runs a step-event generator on a daemon thread, ahead of playback.
+    # Events are handed over in chunks through a bounded buffer: the thread
+    # blocks once `capacity` events are waiting, so a paused run precomputes
+    # that far and no further. ready() tells the consumer how many next()
+    # calls will return without blocking, which lets the GUI thread take
+    # only what has already been produced.
+    def __init__(self, generator, capacity=65536, chunk=256):
+        self.generator = generator
+        self.capacity = capacity
+        self.chunk = chunk
+        self.chunks = deque()
+        self.buffered = 0
+        self.head = []
+        self.index = 0
+        self.done = False
+        self.closed = False
+        self.error = None
+        self.condition = threading.Condition()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        
+    def run(self):
+        chunk = []
+        try:
+            for event in self.generator:
+                chunk.append(event)
+                if len(chunk) == self.chunk:
+                    if not self.put(chunk):
+                        # Lets the generator release what it holds
+                        self.generator.close()
+                        return
+                    chunk = []
+        except Exception as exc:
+            self.error = exc
+        self.put(chunk, done=True)
+        
+    def put(self, chunk, done=False):
+        with self.condition:
+            while self.buffered >= self.capacity and not self.closed:
+                self.condition.wait()
+            if self.closed:
+                return False
+            if chunk:
+                self.chunks.append(chunk)
+                self.buffered += len(chunk)
+            self.done = done
+            self.condition.notify_all()
+            return True
+            
+    def ready(self):
+        if self.done:
+            return sys.maxsize
+        return len(self.head) - self.index + self.buffered
+        
+    def __iter__(self):
+        return self
+        
+    def __next__(self):
+        head = self.head
+        if self.index == len(head):
+            head = self.take()
+        event = head[self.index]
+        self.index += 1
+        return event
+        
+    def take(self):
+        with self.condition:
+            while not self.chunks:
+                if self.done:
+                    # The generator's exception is raised once, then the
+                    # producer is simply exhausted
+                    error, self.error = self.error, None
+                    if error is not None:
+                        raise error
+                    raise StopIteration
+                self.condition.wait()
+            head = self.head = self.chunks.popleft()
+            self.index = 0
+            self.buffered -= len(head)
+            self.condition.notify_all()
+        return head
+        
+    def close(self):
+        # Stops the thread at its next hand-over; pending events are dropped
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+
+class StepCounter:
+    # Counts the events of a generator on a daemon thread, so a target
+    # duration never needs a dry run on the GUI thread. `total` stays None
+    # until the count is done.
+    def __init__(self, generator):
+        self.total = None
+        self.closed = False
+        self.thread = threading.Thread(target=self.run, args=(generator,), daemon=True)
+        self.thread.start()
+        
+    def run(self, generator):
+        steps = 0
+        for _ in generator:
+            steps += 1
+            if not steps & 1023 and self.closed:
+                generator.close()
+                return
+        self.total = steps
+        
+    def close(self):
+        self.closed = True
+
+
+# Playback timer period; the engine decides how many steps each frame takes
+FRAME_INTERVAL = 30  # milliseconds
+
+
+class Playback:
+    # Advances a step-event generator at a logical rate in steps per second.
+    # Each frame applies every step that has come due, within a time budget,
+    # and the tracker coalesces their effects so the caller redraws once.
+    # When a frame runs out of budget the backlog is dropped, so the
+    # achieved rate adapts down instead of falling further behind. With a
+    # target duration, once total_steps is known the rate is re-derived every
+    # frame from the steps and the time left, so a count that arrives late
+    # or a frame that drops steps is made up over the rest of the run.
+    # A source with a ready() method (StepProducer, Timeline) is never
+    # pulled further than it can deliver without blocking.
+    def __init__(self, generator, tracker, steps_per_second,
+                 frame_budget=0.6 * FRAME_INTERVAL / 1000, total_steps=None, duration=None):
+        self.generator = generator
+        self.tracker = tracker
+        self.frame_budget = frame_budget
+        self.total_steps = total_steps
+        self.duration = duration
+        self.set_rate(steps_per_second)
+        self.credit = 0.0
+        self.started = None
+        self.last = None
+        self.steps = 0
+        self.dropped = 0  # backlog discarded by frames that ran out of budget
+        self.finished = False
+        
+    def set_rate(self, steps_per_second):
+        # Ignored while a target duration sets the pace
+        if not (self.duration and self.total_steps is not None):
+            self.rate = steps_per_second
+            
+    def advance(self):
+        now = time.perf_counter()
+        if self.last is None:
+            self.started = self.last = now
+        if self.duration and self.total_steps is not None:
+            left = max(self.started + self.duration - now, FRAME_INTERVAL / 1000)
+            # At least one step due, to reach the end of the source
+            self.rate = max(self.total_steps - self.steps, 1) / left
+        elapsed = now - self.last
+        self.credit += elapsed * self.rate
+        self.last = now
+        due = int(self.credit)
+        if due <= 0 or self.finished:
+            return 0
+        ready = getattr(self.generator, 'ready', None)
+        starved = ready is not None and ready() < due
+        if starved:
+            due = ready()
+        
+        # Slow redraws stretch the frame period; let stepping use half of it
+        deadline = now + max(self.frame_budget, 0.5 * elapsed)
+        apply = self.tracker.apply
+        generator = self.generator
+        done = 0
+        try:
+            while done < due:
+                apply(next(generator))
+                done += 1
+                if not done & 31 and time.perf_counter() > deadline:
+                    break
+        except StopIteration:
+            self.finished = True
+        if starved or done < due:
+            if not starved and not self.finished:
+                self.dropped += due - done
+            self.credit = 0.0
+        else:
+            self.credit -= done
+        self.steps += done
+        return done
+
+
+class Timeline:
+    # Seekable wrapper around a step-event generator. Events pulled through
+    # it are logged as compact per-step deltas (op, a, b and the text as
+    # encoded by encode_step(), with literal texts kept in self.texts)
+    # and a full tracker checkpoint is kept every `interval` steps, so
+    # seeking restores the nearest checkpoint and replays at most one
+    # interval of deltas instead of starting over from step 0.
+    def __init__(self, source, tracker, interval=None):
+        self.source = source
+        self.tracker = tracker
+        self.interval = interval or max(1024, len(tracker.array))
+        self.checkpoints = {}
+        self.ops = array.array('B')
+        # int32 like the trace records (TRACE_DTYPE)
+        self.a = array.array('i')
+        self.b = array.array('i')
+        self.text_ids = array.array('i')
+        self.text_x = array.array('i')
+        self.text_y = array.array('i')
+        # Literal texts; text id -2 - i stands for self.texts[i]
+        self.texts = []
+        self.text_index = {}
+        self.position = 0
+        self.exhausted = False
+        
+    def __len__(self):
+        return len(self.ops)
+        
+    @property
+    def at_end(self):
+        return self.exhausted and self.position == len(self.ops)
+        
+    def __iter__(self):
+        return self
+        
+    def __next__(self):
+        # Called with the tracker at self.position; the caller applies the
+        # returned event
+        position = self.position
+        if position < len(self.ops):
+            event = self.event(position)
+        else:
+            if self.exhausted:
+                raise StopIteration
+            try:
+                event = next(self.source)
+            except StopIteration:
+                self.exhausted = True
+                raise
+            if position % self.interval == 0:
+                self.checkpoints[position] = self.tracker.copy()
+            self.record(event)
+        self.position = position + 1
+        return event
+        
+    def record(self, event):
+        op, a, b, text = event
+        text_id, x, y = encode_step(text)
+        if text_id.__class__ is str:
+            literal = text_id
+            text_id = self.text_index.get(literal)
+            if text_id is None:
+                text_id = self.text_index[literal] = -2 - len(self.texts)
+                self.texts.append(literal.format())
+        self.ops.append(op)
+        self.a.append(a)
+        self.b.append(b)
+        self.text_ids.append(text_id)
+        self.text_x.append(x)
+        self.text_y.append(y)
+        
+    def ready(self):
+        # next() calls that won't block on the source
+        replay = len(self.ops) - self.position
+        source_ready = getattr(self.source, 'ready', None)
+        if self.exhausted or source_ready is None:
+            return sys.maxsize
+        return replay + source_ready()
+        
+    def close(self):
+        close = getattr(self.source, 'close', None)
+        if close is not None:
+            close()
+            
+    def event(self, i):
+        text_id = self.text_ids[i]
+        if text_id >= 0:
+            text = (text_id, self.text_x[i], self.text_y[i])
+        else:
+            text = None if text_id == -1 else self.texts[-2 - text_id]
+        return (self.ops[i], self.a[i], self.b[i], text)
+        
+    def seek(self, target):
+        # Moves the tracker to the state after `target` steps, clamped to
+        # the end of the run
+        tracker = self.tracker
+        target = max(0, target)
+        base = min(target, len(self.ops)) // self.interval * self.interval
+        while base > 0 and base not in self.checkpoints:
+            base -= self.interval
+        if target < self.position or (base > self.position and base in self.checkpoints):
+            tracker.restore(self.checkpoints[base])
+            self.position = base
+        while self.position < target:
+            try:
+                tracker.apply(next(self))
+            except StopIteration:
+                break
+        return self.position
+
+
+def count_steps(name, array):
+    return sum(1 for _ in sort_generators[name](list(array)))
+
+
+# Frame profiling
+def process_memory():
+    # Resident set size in bytes; the peak instead where the current value
+    # isn't available, None where neither is
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+FRAME_PHASES = ('step', 'update', 'draw')
+
+
+class FrameProfiler:
+    # Per-frame timings for the animation loop. Each timer tick is split
+    # into phases: 'step' pulls events from the generator and applies them
+    # to the tracker, 'update' syncs the bar artists and 'draw' blits them
+    # (or requests a full redraw). Whatever is left of the tick-to-tick
+    # interval went to the backend and the GUI event loop. Hooks are called
+    # with every finished frame record; the last `history` records are kept
+    # for summary() and dump().
+    def __init__(self, interval=FRAME_INTERVAL / 1000, history=100000, memory_every=10):
+        self.interval = interval
+        self.memory_every = memory_every
+        self.frames = deque(maxlen=history)
+        self.hooks = []
+        self.count = 0
+        self.late = 0
+        self.memory = process_memory()
+        self.last = None
+        self.start = None
+        self.phases = None
+        
+    def add_hook(self, hook):
+        self.hooks.append(hook)
+        
+    def remove_hook(self, hook):
+        self.hooks.remove(hook)
+        
+    def resume(self):
+        # The gap across a pause is not a late frame
+        self.last = None
+        
+    def begin(self):
+        self.start = self.marked = time.perf_counter()
+        self.phases = dict.fromkeys(FRAME_PHASES, 0.0)
+        
+    def mark(self, phase):
+        # Charges the time since the previous mark to `phase`; a no-op
+        # outside begin()/end(), e.g. for redraws while seeking
+        if self.phases is None:
+            return
+        now = time.perf_counter()
+        self.phases[phase] += now - self.marked
+        self.marked = now
+        
+    def end(self, steps, dropped=0):
+        start = self.start
+        interval = 0.0 if self.last is None else start - self.last
+        self.last = start
+        late = interval > 1.5 * self.interval
+        self.late += late
+        if not self.count % self.memory_every:
+            self.memory = process_memory()
+        record = {
+            'frame': self.count,
+            'time': start,
+            'interval': interval,
+            'steps': steps,
+            'dropped': dropped,
+            **self.phases,
+            'late': late,
+            'memory': self.memory,
+        }
+        self.count += 1
+        self.phases = None
+        self.frames.append(record)
+        for hook in self.hooks:
+            hook(record)
+        return record
+        
+    def summary(self, window=1.0):
+        # Rates and mean phase times over the last `window` seconds
+        frames = self.frames
+        if not frames:
+            return None
+        since = frames[-1]['time'] - window
+        recent = []
+        for record in reversed(frames):
+            if record['time'] < since:
+                break
+            recent.append(record)
+        span = recent[0]['time'] - recent[-1]['time']
+        count = len(recent)
+        summary = {
+            'fps': (count - 1) / span if span else 0.0,
+            'redraws_per_second': sum(1 for r in recent if r['steps']) / span if span else 0.0,
+            'steps_per_second': sum(r['steps'] for r in recent) / span if span else 0.0,
+            'dropped': sum(r['dropped'] for r in recent),
+            'late': self.late,
+            'memory': self.memory,
+        }
+        busy = 0.0
+        for phase in FRAME_PHASES:
+            summary[phase] = sum(r[phase] for r in recent) / count
+            busy += summary[phase]
+        intervals = [r['interval'] for r in recent if r['interval']]
+        summary['backend'] = max(0.0, sum(intervals) / len(intervals) - busy) if intervals else 0.0
+        return summary
+        
+    def format_summary(self, requested_rate):
+        summary = self.summary()
+        if summary is None:
+            return ''
+        memory = summary['memory']
+        return (f"{summary['fps']:.0f}/{1 / self.interval:.0f} fps  "
+                f"{summary['steps_per_second']:,.0f}/{requested_rate:,.0f} steps/s\n"
+                f"step {summary['step'] * 1000:.1f}  update {summary['update'] * 1000:.1f}  "
+                f"draw {summary['draw'] * 1000:.1f}  backend {summary['backend'] * 1000:.1f} ms\n"
+                f"late {summary['late']}  dropped {summary['dropped']:,}  "
+                f"RSS {'?' if memory is None else f'{memory / 2 ** 20:.0f} MB'}")
+        
+    def dump(self, path):
+        # Writes the kept frame records as JSON for offline analysis
+        with open(path, 'w') as f:
+            json.dump({'interval': self.interval, 'frames': list(self.frames)}, f)
+
+
+class BarRenderer:
+    # Retained-mode bar chart: the BarContainer is built once per array and
+    # only the rectangles whose height or state changed are touched. Frames
+    # are blitted over a cached background instead of redrawing the figure.
+    # A managed renderer leaves background capture and blitting to its owner
+    # (see RaceView) so several renderers can share one figure; `children`
+    # are managed renderers drawn along with this one.
+    def __init__(self, ax, palette, extra_artists=(), managed=False):
+        self.ax = ax
+        self.fig = ax.figure
+        self.canvas = self.fig.canvas
+        self.palette = palette
+        self.bars = None
+        self.heights = []
+        self.states = bytearray()
+        self.background = None
+        self.extra_artists = list(extra_artists)
+        for artist in self.extra_artists:
+            artist.set_animated(True)
+        self.children = []
+        self.cid = None if managed else self.canvas.mpl_connect('draw_event', self.on_draw)
+        
+    def reset(self, heights, states):
+        if self.bars is not None:
+            self.bars.remove()
+        n = len(heights)
+        colors = [self.palette[s] for s in states]
+        self.bars = self.ax.bar(np.arange(n), heights, color=colors, width=0.8)
+        for rect in self.bars:
+            rect.set_animated(True)
+        self.heights = list(heights)
+        self.states = bytearray(states)
+        self.ax.set_xlim(-0.5, n - 0.5)
+        # Force a full draw so the background is captured without the bars
+        self.background = None
+        self.canvas.draw_idle()
+        
+    def update(self, heights, states, indices=None):
+        if self.apply(heights, states, indices):
+            self.blit()
+            
+    def apply(self, heights, states, indices=None):
+        # Syncs the artists without drawing. indices limits the diff to the
+        # elements touched since the last frame; None rescans the whole
+        # array. Returns False when the chart had to be rebuilt instead.
+        if self.bars is None or len(heights) != len(self.heights):
+            self.reset(heights, states)
+            return False
+        if indices is None:
+            indices = range(len(heights))
+        rects = self.bars.patches
+        drawn_heights = self.heights
+        drawn_states = self.states
+        palette = self.palette
+        for i in indices:
+            h = heights[i]
+            if h != drawn_heights[i]:
+                rects[i].set_height(h)
+                drawn_heights[i] = h
+            st = states[i]
+            if st != drawn_states[i]:
+                rects[i].set_facecolor(palette[st])
+                drawn_states[i] = st
+        return True
+        
+    def blit(self):
+        if self.background is None or not self.canvas.supports_blit:
+            self.canvas.draw_idle()
+            return
+        self.canvas.restore_region(self.background)
+        self.draw_animated()
+        self.canvas.blit(self.fig.bbox)
+        
+    def draw_animated(self):
+        if self.bars is not None:
+            for rect in self.bars.patches:
+                self.fig.draw_artist(rect)
+        for artist in self.extra_artists:
+            self.fig.draw_artist(artist)
+        for child in self.children:
+            child.draw_animated()
+            
+    def on_draw(self, event):
+        self.background = self.canvas.copy_from_bbox(self.fig.bbox)
+        self.draw_animated()
+        
+    def close(self):
+        if self.cid is not None:
+            self.canvas.mpl_disconnect(self.cid)
+        if self.bars is not None:
+            self.bars.remove()
+            self.bars = None
+
+
+# Arrays above this size are drawn with DecimatedRenderer
+LARGE_ARRAY_THRESHOLD = 2000
+
+
+class DecimatedRenderer(BarRenderer):
+    # Large-array renderer: the n elements are binned into one column per
+    # screen pixel and each column is painted into a single RGBA image from
+    # the min/max of its bin, solid up to the minimum and translucent up to
+    # the maximum. Updates repaint only the columns holding dirty indices,
+    # so frame cost depends on the axes width rather than on n.
+    ENVELOPE_ALPHA = 110
+    # States in rising highlight priority for columns that mix states, and
+    # the priority of every state
+    PRIORITY_STATE = np.array([STATE_UNSORTED,
+                               *range(STATE_WORKER, STATE_WORKER + WORKER_STATES),
+                               STATE_SORTED, STATE_COMPARING, STATE_SWAPPING], dtype=np.uint8)
+    STATE_PRIORITY = np.argsort(PRIORITY_STATE).astype(np.uint8)
+    
+    def __init__(self, ax, palette, extra_artists=(), managed=False):
+        super().__init__(ax, palette, extra_artists, managed)
+        from matplotlib.colors import to_rgba_array
+        
+        self.rgba = (to_rgba_array(palette) * 255).astype(np.uint8)
+        self.image = None
+        
+    def reset(self, heights, states):
+        if self.image is not None:
+            self.image.remove()
+        self.heights = np.asarray(heights)
+        n = len(self.heights)
+        width = max(1, min(n, int(self.ax.bbox.width)))
+        height = max(1, int(self.ax.bbox.height))
+        self.bounds = np.arange(width + 1) * n // width
+        # Column of every element, for mapping dirty indices to columns
+        self.column_of = np.repeat(np.arange(width), np.diff(self.bounds))
+        ymin, ymax = self.ax.get_ylim()
+        self.rows = ymin + (np.arange(height)[:, None] + 0.5) * (ymax - ymin) / height
+        self.pixels = np.zeros((height, width, 4), dtype=np.uint8)
+        self.col_min = np.zeros(width)
+        self.col_max = np.zeros(width)
+        self.col_state = np.zeros(width, dtype=np.uint8)
+        self.image = self.ax.imshow(self.pixels, origin='lower', aspect='auto',
+                                    interpolation='nearest', animated=True,
+                                    extent=(-0.5, n - 0.5, ymin, ymax))
+        self.ax.set_xlim(-0.5, n - 0.5)
+        self.ax.set_ylim(ymin, ymax)
+        self.repaint(states, np.arange(width))
+        self.background = None
+        self.canvas.draw_idle()
+        
+    def apply(self, heights, states, indices=None):
+        if self.image is None or len(heights) != len(self.heights):
+            self.reset(heights, states)
+            return False
+        self.heights = np.asarray(heights)
+        if indices is None or len(indices) * 4 > len(self.heights):
+            columns = np.arange(len(self.col_min))
+        else:
+            columns = np.unique(self.column_of[np.fromiter(indices, dtype=np.intp,
+                                                           count=len(indices))])
+        if len(columns):
+            self.repaint(states, columns)
+        return True
+        
+    def repaint(self, states, columns):
+        heights = self.heights
+        states = np.frombuffer(states, dtype=np.uint8)
+        if len(columns) == len(self.col_min):
+            starts = self.bounds[:-1]
+            priority = self.STATE_PRIORITY[states]
+            self.col_min = np.minimum.reduceat(heights, starts)
+            self.col_max = np.maximum.reduceat(heights, starts)
+            self.col_state = self.PRIORITY_STATE[np.maximum.reduceat(priority, starts)]
+        else:
+            # Only the dirty bins are mapped to priorities, not all n states
+            for c in columns.tolist():
+                lo, hi = self.bounds[c], self.bounds[c + 1]
+                self.col_min[c] = heights[lo:hi].min()
+                self.col_max[c] = heights[lo:hi].max()
+                self.col_state[c] = self.PRIORITY_STATE[self.STATE_PRIORITY[states[lo:hi]].max()]
+        solid = self.rows < self.col_min[columns]
+        envelope = (self.rows < self.col_max[columns]) & ~solid
+        color = self.rgba[self.col_state[columns]]
+        block = np.zeros((len(self.rows), len(columns), 4), dtype=np.uint8)
+        block[solid] = np.broadcast_to(color, block.shape)[solid]
+        faded = color.copy()
+        faded[:, 3] = self.ENVELOPE_ALPHA
+        block[envelope] = np.broadcast_to(faded, block.shape)[envelope]
+        self.pixels[:, columns] = block
+        self.image.set_data(self.pixels)
+        
+    def draw_animated(self):
+        if self.image is not None:
+            self.fig.draw_artist(self.image)
+        for artist in self.extra_artists:
+            self.fig.draw_artist(artist)
+        for child in self.children:
+            child.draw_animated()
+            
+    def close(self):
+        if self.cid is not None:
+            self.canvas.mpl_disconnect(self.cid)
+        if self.image is not None:
+            self.image.remove()
+            self.image = None
+
 
 class SortingVisualizer:
+    # Colors
+    COLOR_UNSORTED = '#6366f1'   # Indigo
+    COLOR_COMPARING = '#f59e0b'  # Amber
+    COLOR_SWAPPING = '#ef4444'   # Red
+    COLOR_SORTED = '#10b981'     # Green
+    COLOR_BG = '#1f2937'         # Dark gray
+    COLOR_PANEL = '#374151'      # Lighter gray
+    # One tint per parallel worker
+    WORKER_COLORS = ('#22d3ee', '#a78bfa', '#f472b6', '#a3e635',
+                     '#38bdf8', '#fb923c', '#2dd4bf', '#e879f9')
+    # Indexed by the STATE_* constants
+    palette = (COLOR_UNSORTED, COLOR_COMPARING, COLOR_SWAPPING, COLOR_SORTED) + WORKER_COLORS
+    aux_palette = ('#a5b4fc',) + palette[1:]
+    
+    # External sort in the window: 256 keys per block (bar) and a memory
+    # budget of five blocks, so fan-in 4 and several merge passes
+    EXTERNAL_BLOCK = 2048  # bytes
+    EXTERNAL_BUDGET = 5 * EXTERNAL_BLOCK
+    # Bars of the external sort in large mode, so its input stays at 8 MiB
+    # instead of 256 keys for each of up to a million bars
+    EXTERNAL_MAX_BLOCKS = 4096
+    
+    # Bar area, alone or sharing its space with the aux buffer row
+    BARS_POSITION = [0.05, 0.35, 0.6, 0.55]
+    BARS_WITH_AUX_POSITION = [0.05, 0.49, 0.6, 0.41]
+    AUX_POSITION = [0.05, 0.35, 0.6, 0.12]
+    
     def __init__(self):
         self.size = 25
-        self.speed = 100  # milliseconds delay
+        self.speed = 10  # logical steps per second
+        self.target_duration = None  # seconds, overrides speed when set
         self.array = []
-        self.colors = []
+        self.tracker = StateTracker(self.array)
         self.sorting = False
         self.current_algorithm = 'Bubble Sort'
         self.current_step = ''
-        self.generator = None
-        
-        # Colors
-        self.COLOR_UNSORTED = '#6366f1'   # Indigo
-        self.COLOR_COMPARING = '#f59e0b'  # Amber
-        self.COLOR_SWAPPING = '#ef4444'   # Red
-        self.COLOR_SORTED = '#10b981'     # Green
-        self.COLOR_BG = '#1f2937'         # Dark gray
-        self.COLOR_PANEL = '#374151'      # Lighter gray
+        self.timer = None
+        self.playback = None
+        self.timeline = None
+        self.step_counter = None
+        self.playback_start = 0
+        self.race = None
+        self.large_mode = False
+        self.pivot_strategy = 'last'
+        self.distribution = 'uniform'
+        self.seed = None  # fixed input seed, None draws a new one per array
+        self.analysis = {}  # algorithm name -> analyze_complexity() result
+        self.analysis_pool = None  # process running an on_analyze() sweep
+        self.analysis_timer = None
+        self.external_dir = None  # scratch files of the external sort
+        self.external_input = None
+        self.profiler = FrameProfiler()
+        self.show_hud = False
+        self.array_seed = None
         
         self.setup_gui()
         self.generate_array()
         
     def setup_gui(self):
+        import matplotlib.pyplot as plt
+        from matplotlib.widgets import Button, CheckButtons, RadioButtons, Slider, TextBox
+        
         # Create figure with dark background
         self.fig = plt.figure(figsize=(14, 9), facecolor=self.COLOR_BG)
         self.fig.canvas.manager.set_window_title('🔄 Sorting Visualizer')
         
         # Main bar chart area
-        self.ax_bars = self.fig.add_axes([0.05, 0.35, 0.6, 0.55], facecolor=self.COLOR_PANEL)
+        self.ax_bars = self.fig.add_axes(self.BARS_POSITION, facecolor=self.COLOR_PANEL)
         self.ax_bars.set_xticks([])
         self.ax_bars.set_yticks([])
         for spine in self.ax_bars.spines.values():
             spine.set_color(self.COLOR_PANEL)
+        self.ax_bars.set_ylim(0, 110)
+        
+        # Auxiliary buffer row, shown under the bars while an algorithm
+        # that uses one (merge sort) is on screen
+        self.ax_aux = self.fig.add_axes(self.AUX_POSITION, facecolor=self.COLOR_PANEL)
+        self.ax_aux.set_xticks([])
+        self.ax_aux.set_yticks([])
+        for spine in self.ax_aux.spines.values():
+            spine.set_color('#4b5563')
+        self.ax_aux.set_ylim(0, 110)
+        self.ax_aux.text(0.01, 0.95, 'Aux buffer', ha='left', va='top', fontsize=7,
+                         color='#9ca3af', transform=self.ax_aux.transAxes)
+        self.ax_aux.set_visible(False)
+        self.aux_renderer = None
         
         # Current step display
         self.ax_step = self.fig.add_axes([0.05, 0.28, 0.6, 0.05], facecolor=self.COLOR_PANEL)
@@ -120,6 +2517,45 @@ class SortingVisualizer:
                                             fontsize=10, color='#fde047', 
                                             transform=self.ax_step.transAxes)
         
+        # Timeline scrubber with step back/forward buttons
+        self.ax_timeline = self.fig.add_axes([0.09, 0.25, 0.52, 0.02], facecolor='#1f2937')
+        self.ax_timeline.set_xticks([])
+        self.ax_timeline.set_yticks([])
+        self.ax_timeline.set_xlim(0, 1)
+        self.ax_timeline.set_ylim(0, 1)
+        for spine in self.ax_timeline.spines.values():
+            spine.set_color('#4b5563')
+        self.timeline_bar = plt.Rectangle((0, 0), 0, 1, facecolor='#818cf8')
+        self.ax_timeline.add_patch(self.timeline_bar)
+        self.timeline_text = self.ax_timeline.text(0.5, 0.5, '', ha='center', va='center',
+                                                   fontsize=7, color='white')
+        self.scrubbing = False
+        self.fig.canvas.mpl_connect('button_press_event', self.on_timeline_press)
+        self.fig.canvas.mpl_connect('motion_notify_event', self.on_timeline_drag)
+        self.fig.canvas.mpl_connect('button_release_event', self.on_timeline_release)
+        
+        self.ax_back = self.fig.add_axes([0.05, 0.25, 0.03, 0.02])
+        self.btn_back = Button(self.ax_back, '◀', color=self.COLOR_PANEL, hovercolor='#4b5563')
+        self.btn_back.label.set_color('white')
+        self.btn_back.on_clicked(self.on_step_back)
+        
+        self.ax_forward = self.fig.add_axes([0.62, 0.25, 0.03, 0.02])
+        self.btn_forward = Button(self.ax_forward, '▶', color=self.COLOR_PANEL, hovercolor='#4b5563')
+        self.btn_forward.label.set_color('white')
+        self.btn_forward.on_clicked(self.on_step_forward)
+        
+        # Performance HUD, toggled from the options box
+        self.hud_text = self.ax_bars.text(0.01, 0.98, '', ha='left', va='top', fontsize=8,
+                                          family='monospace', color='#e5e7eb',
+                                          transform=self.ax_bars.transAxes, visible=False,
+                                          bbox=dict(facecolor=self.COLOR_BG, alpha=0.8,
+                                                    edgecolor='none'))
+        
+        # Redrawn with the bars on every frame
+        self.overlay_artists = [self.step_text, self.timeline_bar, self.timeline_text,
+                                self.hud_text]
+        self.renderer = BarRenderer(self.ax_bars, self.palette, extra_artists=self.overlay_artists)
+        
         # Title
         self.fig.text(0.35, 0.94, '🔄 Sorting Visualizer', ha='center', va='center',
                       fontsize=20, fontweight='bold', color='#818cf8')
@@ -149,47 +2585,140 @@ class SortingVisualizer:
         
         # Controls area
         # Algorithm selector
-        self.ax_radio = self.fig.add_axes([0.05, 0.02, 0.15, 0.15], facecolor=self.COLOR_PANEL)
+        self.ax_radio = self.fig.add_axes([0.05, 0.015, 0.15, 0.19], facecolor=self.COLOR_PANEL)
         self.radio = RadioButtons(self.ax_radio, list(algorithms.keys()), 
                                    active=0, activecolor='#818cf8')
         for label in self.radio.labels:
             label.set_color('white')
-            label.set_fontsize(8)
+            label.set_fontsize(7)
         self.radio.on_clicked(self.on_algorithm_change)
         
+        # Pivot strategy for the quick sort family
+        self.ax_pivot = self.fig.add_axes([0.86, 0.16, 0.12, 0.1], facecolor=self.COLOR_PANEL)
+        self.radio_pivot = RadioButtons(self.ax_pivot, list(PIVOT_STRATEGIES),
+                                        active=0, activecolor='#818cf8')
+        for label in self.radio_pivot.labels:
+            label.set_color('white')
+            label.set_fontsize(7)
+        self.radio_pivot.on_clicked(self.on_pivot_change)
+        
         # Size slider
         self.ax_size = self.fig.add_axes([0.28, 0.12, 0.15, 0.03], facecolor=self.COLOR_PANEL)
-        self.slider_size = Slider(self.ax_size, 'Size', 8, 50, valinit=self.size, 
-                                   valstep=1, color='#818cf8')
-        self.slider_size.label.set_color('white')
-        self.slider_size.valtext.set_color('white')
-        self.slider_size.on_changed(self.on_size_change)
+        self.slider_size = None
+        self.make_size_slider(8, 50, 1)
         
         # Speed slider
         self.ax_speed = self.fig.add_axes([0.28, 0.05, 0.15, 0.03], facecolor=self.COLOR_PANEL)
-        self.slider_speed = Slider(self.ax_speed, 'Speed', 10, 500, valinit=self.speed,
-                                    valstep=10, color='#818cf8')
+        # Log scale: 10**val steps per second, 1 to 100k
+        self.slider_speed = Slider(self.ax_speed, 'Speed', 0, 5, valinit=np.log10(self.speed),
+                                    valstep=0.1, color='#818cf8')
         self.slider_speed.label.set_color('white')
         self.slider_speed.valtext.set_color('white')
+        self.slider_speed.valtext.set_text(f'{self.speed:g}/s')
         self.slider_speed.on_changed(self.on_speed_change)
         
+        # Target duration (empty = use Speed)
+        self.ax_duration = self.fig.add_axes([0.66, 0.015, 0.06, 0.04])
+        self.box_duration = TextBox(self.ax_duration, 'Finish in (s) ', color=self.COLOR_PANEL,
+                                    hovercolor='#4b5563')
+        self.box_duration.label.set_color('white')
+        self.box_duration.label.set_fontsize(8)
+        self.box_duration.text_disp.set_color('white')
+        self.box_duration.on_submit(self.on_duration_submit)
+        
         # Buttons
         self.ax_new = self.fig.add_axes([0.5, 0.08, 0.1, 0.05])
         self.btn_new = Button(self.ax_new, 'New Array', color=self.COLOR_PANEL, hovercolor='#4b5563')
         self.btn_new.label.set_color('white')
         self.btn_new.on_clicked(self.on_new_array)
         
-        self.ax_start = self.fig.add_axes([0.62, 0.08, 0.1, 0.05])
-        self.btn_start = Button(self.ax_start, 'Start', color='#4f46e5', hovercolor='#6366f1')
-        self.btn_start.label.set_color('white')
-        self.btn_start.on_clicked(self.on_start)
+        self.ax_start = self.fig.add_axes([0.62, 0.08, 0.1, 0.05])
+        self.btn_start = Button(self.ax_start, 'Start', color='#4f46e5', hovercolor='#6366f1')
+        self.btn_start.label.set_color('white')
+        self.btn_start.on_clicked(self.on_start)
+        
+        self.ax_stop = self.fig.add_axes([0.74, 0.08, 0.1, 0.05])
+        self.btn_stop = Button(self.ax_stop, 'Stop', color='#dc2626', hovercolor='#ef4444')
+        self.btn_stop.label.set_color('white')
+        self.btn_stop.on_clicked(self.on_stop)
+        
+        # Input distribution (cycles on click) and seed
+        self.ax_distribution = self.fig.add_axes([0.5, 0.15, 0.16, 0.04])
+        self.btn_distribution = Button(self.ax_distribution, f'Input: {self.distribution}',
+                                       color=self.COLOR_PANEL, hovercolor='#4b5563')
+        self.btn_distribution.label.set_color('white')
+        self.btn_distribution.label.set_fontsize(8)
+        self.btn_distribution.on_clicked(self.on_distribution_change)
+        
+        self.ax_seed = self.fig.add_axes([0.74, 0.15, 0.1, 0.04])
+        self.box_seed = TextBox(self.ax_seed, 'Seed ', color=self.COLOR_PANEL, hovercolor='#4b5563')
+        self.box_seed.label.set_color('white')
+        self.box_seed.label.set_fontsize(8)
+        self.box_seed.text_disp.set_color('white')
+        self.box_seed.on_submit(self.on_seed_submit)
+        
+        self.ax_race = self.fig.add_axes([0.5, 0.015, 0.08, 0.04])
+        self.btn_race = Button(self.ax_race, 'Race all', color=self.COLOR_PANEL, hovercolor='#4b5563')
+        self.btn_race.label.set_color('white')
+        self.btn_race.on_clicked(self.on_race)
+        
+        self.ax_analyze = self.fig.add_axes([0.76, 0.015, 0.08, 0.04])
+        self.btn_analyze = Button(self.ax_analyze, 'Analyze', color=self.COLOR_PANEL,
+                                  hovercolor='#4b5563')
+        self.btn_analyze.label.set_color('white')
+        self.btn_analyze.on_clicked(self.on_analyze)
+        
+        # Large-array mode and performance HUD toggles
+        self.ax_options = self.fig.add_axes([0.86, 0.06, 0.12, 0.09], facecolor=self.COLOR_PANEL)
+        self.check_options = CheckButtons(self.ax_options, ['Large array', 'Perf HUD'],
+                                          [self.large_mode, self.show_hud])
+        for label in self.check_options.labels:
+            label.set_color('white')
+            label.set_fontsize(8)
+        self.check_options.on_clicked(self.on_option_toggle)
+        
+    def make_size_slider(self, valmin, valmax, valstep, valfmt=None):
+        from matplotlib.widgets import Slider
         
-        self.ax_stop = self.fig.add_axes([0.74, 0.08, 0.1, 0.05])
-        self.btn_stop = Button(self.ax_stop, 'Stop', color='#dc2626', hovercolor='#ef4444')
-        self.btn_stop.label.set_color('white')
-        self.btn_stop.on_clicked(self.on_stop)
+        # The slider is rebuilt rather than rescaled when the range changes
+        if self.slider_size is not None:
+            self.slider_size.disconnect_events()
+            self.ax_size.clear()
+        self.slider_size = Slider(self.ax_size, 'Size', valmin, valmax, valinit=self.size,
+                                   valstep=valstep, valfmt=valfmt, color='#818cf8')
+        self.slider_size.label.set_color('white')
+        self.slider_size.valtext.set_color('white')
+        self.slider_size.on_changed(self.on_size_change)
         
+    def use_renderer(self, n):
+        renderer_class = DecimatedRenderer if n > LARGE_ARRAY_THRESHOLD else BarRenderer
+        if type(self.renderer) is not renderer_class:
+            children = self.renderer.children
+            self.renderer.close()
+            self.renderer = renderer_class(self.ax_bars, self.palette,
+                                           extra_artists=self.overlay_artists)
+            self.renderer.children = children
+            
+    def show_aux(self, visible):
+        # The caller resets the main renderer, whose axes change size
+        if visible == (self.aux_renderer is not None):
+            return
+        self.ax_aux.set_visible(visible)
+        self.ax_bars.set_position(self.BARS_WITH_AUX_POSITION if visible else self.BARS_POSITION)
+        if visible:
+            n = len(self.tracker.array)
+            renderer_class = DecimatedRenderer if n > LARGE_ARRAY_THRESHOLD else BarRenderer
+            self.aux_renderer = renderer_class(self.ax_aux, self.aux_palette, managed=True)
+            self.renderer.children.append(self.aux_renderer)
+        else:
+            self.renderer.children.remove(self.aux_renderer)
+            self.aux_renderer.close()
+            self.aux_renderer = None
+        self.fig.canvas.draw_idle()
+            
     def update_info_panel(self):
+        import matplotlib.pyplot as plt
+        
         self.ax_info.clear()
         self.ax_info.set_xticks([])
         self.ax_info.set_yticks([])
@@ -217,6 +2746,16 @@ class SortingVisualizer:
                           fontsize=7, color='#9ca3af',
                           transform=self.ax_info.transAxes)
         
+        # Measured complexity, once analyzed
+        analysis = self.analysis.get(self.current_algorithm)
+        if analysis is not None:
+            self.ax_info.text(0.05, 0.32, 'Measured:', ha='left', va='top',
+                              fontsize=9, fontweight='bold', color='#34d399',
+                              transform=self.ax_info.transAxes)
+            self.ax_info.text(0.05, 0.26, format_analysis(analysis), ha='left', va='top',
+                              fontsize=7, color='#9ca3af', family='monospace',
+                              transform=self.ax_info.transAxes)
+        
         # Complexity boxes
         complexities = [
             ('Best', info['best'], '#10b981'),
@@ -245,242 +2784,51 @@ class SortingVisualizer:
         self.fig.canvas.draw_idle()
         
     def generate_array(self):
-        self.array = [random.randint(10, 100) for _ in range(self.size)]
-        self.colors = [self.COLOR_UNSORTED] * self.size
-        self.update_bars()
-        self.step_text.set_text('')
+        # Without a fixed seed a fresh one is drawn and shown, so any input
+        # seen on screen can be regenerated exactly
+        self.array_seed = self.seed if self.seed is not None else random.randrange(2 ** 31)
+        self.array = generate_input(self.distribution, self.size, self.array_seed)
+        if not self.large_mode:
+            self.array = self.array.tolist()
+        self.tracker = StateTracker(self.array)
+        self.close_timeline()
+        self.step_text.set_text(f'Input: {self.distribution}, seed {self.array_seed}')
+        self.update_timeline()
+        self.show_aux(False)
+        self.use_renderer(self.size)
+        self.renderer.reset(self.array, self.tracker.state)
         
-    def update_bars(self):
-        self.ax_bars.clear()
-        self.ax_bars.set_xticks([])
-        self.ax_bars.set_yticks([])
-        self.ax_bars.set_facecolor(self.COLOR_PANEL)
-        self.ax_bars.set_ylim(0, 110)
+    def update_bars(self, full=False):
+        tracker = self.tracker
+        profiler = self.profiler
+        self.update_timeline()
+        if (tracker.aux is None) != (self.aux_renderer is None):
+            self.show_aux(tracker.aux is not None)
+            self.renderer.reset(tracker.array, tracker.state)
+        synced = self.renderer.apply(tracker.array, tracker.state, None if full else tracker.dirty)
+        tracker.dirty.clear()
+        if self.aux_renderer is not None:
+            synced &= self.aux_renderer.apply(tracker.aux, tracker.aux_state,
+                                              None if full else tracker.aux_dirty)
+            tracker.aux_dirty.clear()
+        profiler.mark('update')
+        if synced:
+            self.renderer.blit()
+        profiler.mark('draw')
         
-        x = np.arange(len(self.array))
-        self.ax_bars.bar(x, self.array, color=self.colors, width=0.8)
-        self.fig.canvas.draw_idle()
+    def update_timeline(self):
+        timeline = self.timeline
+        if timeline is None:
+            self.timeline_bar.set_width(0)
+            self.timeline_text.set_text('')
+            return
+        known = len(timeline)
+        self.timeline_bar.set_width(timeline.position / known if known else 0)
+        self.timeline_text.set_text(f'Step {timeline.position} / {known}'
+                                    + ('' if timeline.exhausted else '+'))
         
     def set_step(self, text):
-        self.step_text.set_text(text)
-        
-    # Sorting Algorithms as Generators
-    def bubble_sort(self):
-        arr = self.array
-        n = len(arr)
-        for i in range(n - 1):
-            for j in range(n - i - 1):
-                self.colors = [self.COLOR_UNSORTED] * n
-                for k in range(n - i, n):
-                    self.colors[k] = self.COLOR_SORTED
-                self.colors[j] = self.COLOR_COMPARING
-                self.colors[j + 1] = self.COLOR_COMPARING
-                self.set_step(f'Comparing elements at index {j} and {j + 1}')
-                yield
-                
-                if arr[j] > arr[j + 1]:
-                    self.colors[j] = self.COLOR_SWAPPING
-                    self.colors[j + 1] = self.COLOR_SWAPPING
-                    self.set_step(f'Swapping {arr[j]} and {arr[j + 1]}')
-                    arr[j], arr[j + 1] = arr[j + 1], arr[j]
-                    yield
-                    
-            self.colors[n - 1 - i] = self.COLOR_SORTED
-            
-        self.colors = [self.COLOR_SORTED] * n
-        self.set_step('Sorting complete!')
-        yield
-        
-    def insertion_sort(self):
-        arr = self.array
-        n = len(arr)
-        for i in range(1, n):
-            key = arr[i]
-            j = i - 1
-            
-            self.colors = [self.COLOR_SORTED if x < i else self.COLOR_UNSORTED for x in range(n)]
-            self.colors[i] = self.COLOR_COMPARING
-            self.set_step(f'Picking element {key} to insert into sorted portion')
-            yield
-            
-            while j >= 0 and arr[j] > key:
-                self.colors[j] = self.COLOR_SWAPPING
-                self.colors[j + 1] = self.COLOR_SWAPPING
-                self.set_step(f'Shifting {arr[j]} to the right')
-                arr[j + 1] = arr[j]
-                yield
-                j -= 1
-                
-            arr[j + 1] = key
-            self.colors = [self.COLOR_SORTED if x <= i else self.COLOR_UNSORTED for x in range(n)]
-            self.set_step(f'Inserting {key} at position {j + 1}')
-            yield
-            
-        self.colors = [self.COLOR_SORTED] * n
-        self.set_step('Sorting complete!')
-        yield
-        
-    def merge_sort(self):
-        arr = self.array
-        n = len(arr)
-        
-        def merge(l, m, r):
-            left = arr[l:m + 1]
-            right = arr[m + 1:r + 1]
-            i = j = 0
-            k = l
-            
-            self.set_step(f'Merging subarrays [{l}..{m}] and [{m + 1}..{r}]')
-            
-            while i < len(left) and j < len(right):
-                self.colors = [self.COLOR_UNSORTED] * n
-                self.colors[l + i] = self.COLOR_COMPARING
-                self.colors[m + 1 + j] = self.COLOR_COMPARING
-                self.set_step(f'Comparing {left[i]} and {right[j]}')
-                yield True
-                
-                if left[i] <= right[j]:
-                    arr[k] = left[i]
-                    i += 1
-                else:
-                    arr[k] = right[j]
-                    j += 1
-                    
-                self.colors[k] = self.COLOR_SWAPPING
-                yield True
-                k += 1
-                
-            while i < len(left):
-                arr[k] = left[i]
-                self.colors[k] = self.COLOR_SWAPPING
-                yield True
-                i += 1
-                k += 1
-                
-            while j < len(right):
-                arr[k] = right[j]
-                self.colors[k] = self.COLOR_SWAPPING
-                yield True
-                j += 1
-                k += 1
-                
-        def sort(l, r):
-            if l < r:
-                m = (l + r) // 2
-                self.set_step(f'Dividing array at index {m}')
-                yield True
-                yield from sort(l, m)
-                yield from sort(m + 1, r)
-                yield from merge(l, m, r)
-                
-        yield from sort(0, n - 1)
-        self.colors = [self.COLOR_SORTED] * n
-        self.set_step('Sorting complete!')
-        yield True
-        
-    def quick_sort(self):
-        arr = self.array
-        n = len(arr)
-        sorted_indices = set()
-        
-        def partition(low, high):
-            pivot = arr[high]
-            self.set_step(f'Choosing pivot: {pivot} at index {high}')
-            yield True
-            
-            i = low - 1
-            for j in range(low, high):
-                self.colors = [self.COLOR_UNSORTED] * n
-                for idx in sorted_indices:
-                    self.colors[idx] = self.COLOR_SORTED
-                self.colors[j] = self.COLOR_COMPARING
-                self.colors[high] = self.COLOR_COMPARING
-                self.set_step(f'Comparing {arr[j]} with pivot {pivot}')
-                yield True
-                
-                if arr[j] < pivot:
-                    i += 1
-                    if i != j:
-                        self.colors[i] = self.COLOR_SWAPPING
-                        self.colors[j] = self.COLOR_SWAPPING
-                        self.set_step(f'Swapping {arr[i]} and {arr[j]}')
-                        arr[i], arr[j] = arr[j], arr[i]
-                        yield True
-                        
-            self.colors[i + 1] = self.COLOR_SWAPPING
-            self.colors[high] = self.COLOR_SWAPPING
-            self.set_step(f'Placing pivot {pivot} in correct position')
-            arr[i + 1], arr[high] = arr[high], arr[i + 1]
-            yield True
-            return i + 1
-            
-        def sort(low, high):
-            if low < high:
-                pi_gen = partition(low, high)
-                pi = None
-                for val in pi_gen:
-                    if isinstance(val, int):
-                        pi = val
-                    else:
-                        yield val
-                pi = low
-                for val in partition(low, high):
-                    if isinstance(val, int):
-                        pi = val
-                        break
-                    yield val
-                # Re-run partition to get pi correctly
-                i = low - 1
-                for j in range(low, high):
-                    if arr[j] < arr[high]:
-                        i += 1
-                # Actually, let's simplify
-                
-        # Simplified iterative approach for generator
-        stack = [(0, n - 1)]
-        while stack:
-            low, high = stack.pop()
-            if low < high:
-                pivot = arr[high]
-                self.set_step(f'Choosing pivot: {pivot} at index {high}')
-                self.colors = [self.COLOR_UNSORTED] * n
-                for idx in sorted_indices:
-                    self.colors[idx] = self.COLOR_SORTED
-                yield True
-                
-                i = low - 1
-                for j in range(low, high):
-                    self.colors = [self.COLOR_UNSORTED] * n
-                    for idx in sorted_indices:
-                        self.colors[idx] = self.COLOR_SORTED
-                    self.colors[j] = self.COLOR_COMPARING
-                    self.colors[high] = self.COLOR_COMPARING
-                    self.set_step(f'Comparing {arr[j]} with pivot {pivot}')
-                    yield True
-                    
-                    if arr[j] < pivot:
-                        i += 1
-                        if i != j:
-                            self.colors[i] = self.COLOR_SWAPPING
-                            self.colors[j] = self.COLOR_SWAPPING
-                            self.set_step(f'Swapping {arr[i]} and {arr[j]}')
-                            arr[i], arr[j] = arr[j], arr[i]
-                            yield True
-                            
-                pi = i + 1
-                self.colors[pi] = self.COLOR_SWAPPING
-                self.colors[high] = self.COLOR_SWAPPING
-                self.set_step(f'Placing pivot in correct position')
-                arr[pi], arr[high] = arr[high], arr[pi]
-                yield True
-                
-                sorted_indices.add(pi)
-                stack.append((pi + 1, high))
-                stack.append((low, pi - 1))
-                
-        self.colors = [self.COLOR_SORTED] * n
-        self.set_step('Sorting complete!')
-        yield True
+        self.step_text.set_text(format_step(text))
         
     # Event handlers
     def on_algorithm_change(self, label):
@@ -489,13 +2837,112 @@ class SortingVisualizer:
         if not self.sorting:
             self.generate_array()
             
+    def on_distribution_change(self, event):
+        names = list(DISTRIBUTIONS)
+        self.distribution = names[(names.index(self.distribution) + 1) % len(names)]
+        self.btn_distribution.label.set_text(f'Input: {self.distribution}')
+        if not self.sorting:
+            self.generate_array()
+            
+    def on_seed_submit(self, text):
+        try:
+            self.seed = int(text) if text.strip() else None
+        except ValueError:
+            self.seed = None
+        if not self.sorting:
+            self.generate_array()
+            
+    def on_pivot_change(self, label):
+        self.pivot_strategy = PIVOT_STRATEGIES[label]
+        
     def on_size_change(self, val):
         if not self.sorting:
             self.size = int(val)
             self.generate_array()
             
+    def on_option_toggle(self, label):
+        if label == 'Perf HUD':
+            self.on_hud_toggle()
+        else:
+            self.on_large_toggle()
+            
+    def on_hud_toggle(self):
+        self.show_hud = not self.show_hud
+        self.hud_text.set_visible(self.show_hud)
+        self.renderer.blit()
+        
+    def on_large_toggle(self):
+        self.on_stop(None)
+        self.large_mode = not self.large_mode
+        if self.large_mode:
+            self.size = 100000
+            self.make_size_slider(10000, 1000000, 10000, valfmt='%d')
+        else:
+            self.size = 25
+            self.make_size_slider(8, 50, 1)
+        self.generate_array()
+        
     def on_speed_change(self, val):
-        self.speed = int(val)
+        self.speed = round(10 ** val, 1)
+        self.slider_speed.valtext.set_text(f'{self.speed:g}/s')
+        if self.playback is not None:
+            self.playback.set_rate(self.speed)
+        if self.race is not None:
+            self.race.set_speed(self.speed)
+            
+    def on_analyze(self, event):
+        # A short sweep (the headless analyze_complexity() goes up to 10**6)
+        # in a separate process, so neither the sorting nor tracemalloc
+        # slows the window; a timer picks up the result
+        name = self.current_algorithm
+        if not algorithms[name]['in_process']:
+            if algorithms[name]['in_memory']:
+                self.set_step(f'{name} starts a process pool per run; try the analyze command')
+            else:
+                self.set_step(f'{name} works on files; try the external command')
+            self.renderer.blit()
+            return
+        if self.analysis_pool is not None:
+            return
+        self.set_step(f'Analyzing {name}...')
+        self.renderer.blit()
+        self.analysis_pool = multiprocessing.get_context('spawn').Pool(1)
+        pending = self.analysis_pool.apply_async(
+            analyze_complexity, (name,),
+            dict(max_n=20000, max_n_quadratic=1000, memory_max_n=20000,
+                 distribution=self.distribution))
+        self.analysis_timer = self.fig.canvas.new_timer(interval=200)
+        self.analysis_timer.add_callback(self.poll_analysis, name, pending)
+        self.analysis_timer.start()
+        
+    def poll_analysis(self, name, pending):
+        if not pending.ready():
+            return
+        self.analysis_timer.stop()
+        self.analysis_timer = None
+        self.analysis_pool.terminate()
+        self.analysis_pool = None
+        try:
+            self.analysis[name] = pending.get()
+        except Exception as exc:
+            self.set_step(f'Analysis of {name} failed: {exc}')
+        else:
+            self.set_step(f'Analysis of {name} complete')
+        self.update_info_panel()
+        
+    def on_race(self, event):
+        # Every in-memory algorithm on a copy of the current input, in its
+        # own window. Panels step on the GUI timer, so the pool-based sorts,
+        # which block while their workers run, stay out.
+        names = [name for name in sort_generators if algorithms[name]['in_process']]
+        self.race = RaceView(names, self.array, self.speed, self.generator_settings())
+        self.race.start()
+            
+    def on_duration_submit(self, text):
+        try:
+            self.target_duration = float(text) if text.strip() else None
+        except ValueError:
+            self.target_duration = None
         
     def on_new_array(self, event):
         if not self.sorting:
@@ -504,41 +2951,1425 @@ class SortingVisualizer:
     def on_start(self, event):
         if not self.sorting:
             self.sorting = True
-            if self.current_algorithm == 'Bubble Sort':
-                self.generator = self.bubble_sort()
-            elif self.current_algorithm == 'Insertion Sort':
-                self.generator = self.insertion_sort()
-            elif self.current_algorithm == 'Merge Sort':
-                self.generator = self.merge_sort()
-            elif self.current_algorithm == 'Quick Sort':
-                self.generator = self.quick_sort()
-            self.anim = animation.FuncAnimation(
-                self.fig, self.animate, interval=self.speed,
-                repeat=False, cache_frame_data=False
-            )
-            self.fig.canvas.draw_idle()
+            if self.timeline is not None and not self.timeline.at_end:
+                # Resume a paused or rewound run
+                remaining = None
+                if self.timeline.exhausted:
+                    remaining = len(self.timeline) - self.timeline.position
+                self.start_playback(remaining)
+                return
+            info = algorithms[self.current_algorithm]
+            if self.target_duration and not (info['in_memory'] and info['in_process']):
+                # Counting these steps means sorting twice with a pool or
+                # with file I/O
+                self.sorting = False
+                self.set_step(f'{self.current_algorithm} has no cheap step count; '
+                              f'clear Finish in (s) to run it')
+                self.renderer.blit()
+                return
+            if not info['in_memory']:
+                self.prepare_external_input()
+            # The generator sorts its own copy on a producer thread; the
+            # tracker mirrors its events onto self.array
+            self.close_timeline()
+            self.timeline = Timeline(StepProducer(self.new_generator()), self.tracker)
+            if self.target_duration:
+                # A second copy is counted in the background; playback
+                # runs at the slider speed until the total is in
+                self.step_counter = StepCounter(self.new_generator())
+            self.start_playback()
+            
+    def new_generator(self):
+        info = algorithms[self.current_algorithm]
+        if not info['in_memory']:
+            return info['generator'](self.external_input, memory_budget=self.EXTERNAL_BUDGET,
+                                     block_bytes=self.EXTERNAL_BLOCK)
+        arr = self.array.tolist() if self.large_mode else list(self.array)
+        settings = self.generator_settings()
+        return info['generator'](arr, **{option: settings[option] for option in info['options']})
+        
+    def generator_settings(self):
+        # Values for the registry's generator `options`
+        return {'pivot': self.pivot_strategy, 'seed': self.array_seed}
+            
+    def prepare_external_input(self):
+        # Writes one block of keys per bar to a scratch file; the display
+        # becomes the first key of every block. Generators read the file
+        # and keep their output in private temporary files.
+        if self.external_dir is None:
+            self.external_dir = tempfile.TemporaryDirectory(prefix='sorting-visualizer-')
+        self.external_input = os.path.join(self.external_dir.name, 'input.bin')
+        keys_per_block = self.EXTERNAL_BLOCK // EXTERNAL_DTYPE.itemsize
+        keys = generate_input(self.distribution,
+                              min(self.size, self.EXTERNAL_MAX_BLOCKS) * keys_per_block,
+                              self.array_seed)
+        keys.astype(EXTERNAL_DTYPE, copy=False).tofile(self.external_input)
+        self.array = external_blocks(self.external_input, self.EXTERNAL_BLOCK)
+        if self.large_mode:
+            self.array = np.array(self.array)
+        self.tracker = StateTracker(self.array)
+        self.show_aux(False)
+        self.renderer.reset(self.array, self.tracker.state)
+            
+    def close_timeline(self):
+        if self.timeline is not None:
+            self.timeline.close()
+            self.timeline = None
+        if self.step_counter is not None:
+            self.step_counter.close()
+            self.step_counter = None
+            
+    def replay_trace(self, path):
+        # Plays back a trace written by record_trace()
+        self.on_stop(None)
+        reader = TraceReader(path)
+        if reader.n > LARGE_ARRAY_THRESHOLD:
+            self.array = np.array(reader.array)
+        else:
+            self.array = reader.array.tolist()
+        self.tracker = StateTracker(self.array)
+        self.step_text.set_text('')
+        self.show_aux(False)
+        self.use_renderer(reader.n)
+        self.renderer.reset(self.array, self.tracker.state)
+        self.close_timeline()
+        self.timeline = Timeline(reader.events(), self.tracker)
+        self.sorting = True
+        self.start_playback(reader.steps)
+        
+    def start_playback(self, total_steps=None):
+        # Without a known or pending step count a target duration is ignored
+        duration = None
+        if total_steps is not None or self.step_counter is not None:
+            duration = self.target_duration
+        self.playback = Playback(self.timeline, self.tracker, self.speed,
+                                 total_steps=total_steps, duration=duration)
+        self.playback_start = self.timeline.position
+        # A bare canvas timer instead of FuncAnimation: the animation
+        # class would call draw_idle() after every frame and undo blitting
+        self.profiler.resume()
+        self.timer = self.fig.canvas.new_timer(interval=FRAME_INTERVAL)
+        self.timer.add_callback(self.animate, None)
+        self.timer.start()
             
     def on_stop(self, event):
+        # Pauses; the timeline is kept so Start resumes and seeking works
         self.sorting = False
-        if hasattr(self, 'anim'):
-            self.anim.event_source.stop()
+        if self.timer is not None:
+            self.timer.stop()
         self.set_step('Stopped')
-        self.fig.canvas.draw_idle()
+        self.renderer.blit()
+        
+    def pause(self):
+        self.sorting = False
+        if self.timer is not None:
+            self.timer.stop()
+            
+    def seek(self, position):
+        if self.timeline is None:
+            return
+        self.timeline.seek(position)
+        self.set_step(self.tracker.text)
+        self.update_bars(full=True)
+        
+    def on_step_back(self, event):
+        if self.timeline is not None:
+            self.pause()
+            self.seek(self.timeline.position - 1)
+            
+    def on_step_forward(self, event):
+        if self.timeline is not None:
+            self.pause()
+            self.seek(self.timeline.position + 1)
+            
+    def on_timeline_press(self, event):
+        if event.inaxes is self.ax_timeline and self.timeline is not None:
+            self.scrubbing = True
+            self.on_timeline_drag(event)
+            
+    def on_timeline_drag(self, event):
+        if self.scrubbing and event.inaxes is self.ax_timeline:
+            self.seek(round(event.xdata * len(self.timeline)))
+            
+    def on_timeline_release(self, event):
+        self.scrubbing = False
         
     def animate(self, frame):
         if not self.sorting:
             return
+        playback = self.playback
+        profiler = self.profiler
+        if (playback.duration and playback.total_steps is None
+                and self.step_counter is not None and self.step_counter.total is not None):
+            playback.total_steps = self.step_counter.total - self.playback_start
+        dropped = playback.dropped
+        profiler.begin()
         try:
-            next(self.generator)
-            self.update_bars()
-        except StopIteration:
+            steps = playback.advance()
+        except Exception as exc:
             self.sorting = False
+            self.timer.stop()
+            self.set_step(f'{self.current_algorithm} failed: {exc}')
+            self.update_bars()
+            return
+        profiler.mark('step')
+        if steps:
+            self.set_step(self.tracker.text)
+            if self.show_hud:
+                self.hud_text.set_text(profiler.format_summary(playback.rate))
             self.update_bars()
+        profiler.end(steps, playback.dropped - dropped)
+        if playback.finished:
+            self.sorting = False
+            self.timer.stop()
             
     def run(self):
+        import matplotlib.pyplot as plt
+        
         plt.show()
 
 
-if __name__ == '__main__':
+class RaceView:
+    # Races several algorithms on copies of the same input, one panel each.
+    # A single timer advances every panel and a single blit redraws them all,
+    # so adding panels adds drawing work but no timers or full redraws.
+    # `settings` holds the values for each algorithm's registry options.
+    def __init__(self, names, array, speed, settings):
+        import matplotlib.pyplot as plt
+        
+        self.fig = plt.figure(figsize=(14, 9), facecolor=SortingVisualizer.COLOR_BG)
+        self.fig.canvas.manager.set_window_title('🏁 Sorting Race')
+        self.canvas = self.fig.canvas
+        cols = math.ceil(math.sqrt(len(names)))
+        rows = math.ceil(len(names) / cols)
+        ymax = max(110, max(array, default=0) * 1.1)
+        renderer_class = DecimatedRenderer if len(array) > LARGE_ARRAY_THRESHOLD else BarRenderer
+        frame_budget = 0.6 * FRAME_INTERVAL / 1000 / len(names)
+        
+        self.panels = []
+        for k, name in enumerate(names):
+            row, col = divmod(k, cols)
+            ax = self.fig.add_axes([0.03 + col * 0.96 / cols, 0.05 + (rows - 1 - row) * 0.92 / rows,
+                                    0.96 / cols - 0.03, 0.92 / rows - 0.1],
+                                   facecolor=SortingVisualizer.COLOR_PANEL)
+            ax.set_xticks([])
+            ax.set_yticks([])
+            for spine in ax.spines.values():
+                spine.set_color(SortingVisualizer.COLOR_PANEL)
+            ax.set_ylim(0, ymax)
+            ax.set_title(name, fontsize=11, fontweight='bold', color='#818cf8')
+            counter = ax.text(0.5, -0.03, '', ha='center', va='top', fontsize=8,
+                              color='#fde047', transform=ax.transAxes)
+            tracker = StateTracker(array.copy())
+            renderer = renderer_class(ax, SortingVisualizer.palette, extra_artists=[counter],
+                                      managed=True)
+            renderer.reset(tracker.array, tracker.state)
+            options = algorithms[name]['options']
+            generator = sort_generators[name](list(array),
+                                              **{option: settings[option] for option in options})
+            self.panels.append({
+                'name': name,
+                'tracker': tracker,
+                'renderer': renderer,
+                'counter': counter,
+                'playback': Playback(generator, tracker, speed, frame_budget=frame_budget),
+                'place': None,
+            })
+            self.update_counter(self.panels[-1])
+            
+        self.finished = 0
+        self.background = None
+        self.canvas.mpl_connect('draw_event', self.on_draw)
+        self.timer = self.canvas.new_timer(interval=FRAME_INTERVAL)
+        self.timer.add_callback(self.animate)
+        
+    def start(self):
+        self.fig.show()
+        self.timer.start()
+        
+    def set_speed(self, speed):
+        for panel in self.panels:
+            panel['playback'].set_rate(speed)
+            
+    def update_counter(self, panel):
+        tracker = panel['tracker']
+        text = f'{tracker.comparisons:,} comparisons   {tracker.writes:,} writes'
+        if panel['place'] is not None:
+            text += f'   ✓ #{panel["place"]} in {tracker.steps:,} steps'
+        panel['counter'].set_text(text)
+        
+    def animate(self):
+        for panel in self.panels:
+            playback = panel['playback']
+            if panel['place'] is not None:
+                continue
+            if playback.advance():
+                tracker = panel['tracker']
+                panel['renderer'].apply(tracker.array, tracker.state, tracker.dirty)
+                tracker.dirty.clear()
+            if playback.finished:
+                self.finished += 1
+                panel['place'] = self.finished
+            self.update_counter(panel)
+        self.blit()
+        if self.finished == len(self.panels):
+            self.timer.stop()
+            
+    def draw_animated(self):
+        for panel in self.panels:
+            panel['renderer'].draw_animated()
+            
+    def blit(self):
+        if self.background is None or not self.canvas.supports_blit:
+            self.canvas.draw_idle()
+            return
+        self.canvas.restore_region(self.background)
+        self.draw_animated()
+        self.canvas.blit(self.fig.bbox)
+        
+    def on_draw(self, event):
+        self.background = self.canvas.copy_from_bbox(self.fig.bbox)
+        self.draw_animated()
+
+
+# Offline export. The run is walked once in the parent and cut into chunks
+# of frames, each carrying a tracker checkpoint and its events, so a pool of
+# Agg workers can rasterize the chunks independently. Frames come back in
+# order and are streamed to ffmpeg (MP4/GIF) or written as PNGs by the
+# workers themselves. Frame 0 is the input, then one frame per step event.
+EXPORT_FORMATS = ('mp4', 'gif', 'png')
+_export_figure = None
+
+
+def make_export_figure(figsize, dpi, ymax, n):
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    
+    fig = Figure(figsize=figsize, dpi=dpi, facecolor=SortingVisualizer.COLOR_BG)
+    FigureCanvasAgg(fig)
+    ax = fig.add_axes([0.02, 0.12, 0.96, 0.85], facecolor=SortingVisualizer.COLOR_PANEL)
+    ax.set_xticks([])
+    ax.set_yticks([])
+    for spine in ax.spines.values():
+        spine.set_color(SortingVisualizer.COLOR_PANEL)
+    ax.set_ylim(0, ymax)
+    text = fig.text(0.5, 0.05, '', ha='center', va='center', fontsize=10, color='#fde047')
+    renderer_class = DecimatedRenderer if n > LARGE_ARRAY_THRESHOLD else BarRenderer
+    renderer = renderer_class(ax, SortingVisualizer.palette, extra_artists=[text])
+    return fig, renderer, text
+
+
+def export_chunks(name, array, chunk_frames):
+    tracker = StateTracker(list(array))
+    checkpoint = tracker.copy()
+    start = 0
+    events = []
+    for event in sort_generators[name](list(array)):
+        tracker.apply(event)
+        events.append(event)
+        if len(events) == chunk_frames:
+            yield start, checkpoint, events
+            start += len(events)
+            checkpoint = tracker.copy()
+            events = []
+    if events:
+        yield start, checkpoint, events
+
+
+def _init_export_worker(figsize, dpi, ymax, n):
+    global _export_figure
+    _export_figure = make_export_figure(figsize, dpi, ymax, n)
+
+
+def _render_export_chunk(start, tracker, events, frame_dir):
+    import matplotlib.image
+    
+    fig, renderer, text = _export_figure
+    frames = []
+    
+    def capture(index):
+        rgba = np.asarray(fig.canvas.buffer_rgba())
+        if frame_dir is None:
+            frames.append(rgba[..., :3].tobytes())
+        else:
+            matplotlib.image.imsave(os.path.join(frame_dir, f'frame_{index:06d}.png'), rgba)
+            frames.append(b'')
+            
+    text.set_text(format_step(tracker.text))
+    renderer.update(tracker.array, tracker.state)
+    tracker.dirty.clear()
+    if start == 0:
+        capture(0)
+    for k, event in enumerate(events):
+        tracker.apply(event)
+        text.set_text(format_step(tracker.text))
+        renderer.update(tracker.array, tracker.state, tracker.dirty)
+        tracker.dirty.clear()
+        capture(start + k + 1)
+    return len(frames), b''.join(frames)
+
+
+class FFmpegSink:
+    def __init__(self, path, fmt, fps, width, height):
+        import matplotlib
+        
+        ffmpeg = shutil.which(matplotlib.rcParams['animation.ffmpeg_path'])
+        if ffmpeg is None:
+            raise RuntimeError(f'ffmpeg is required to export {fmt.upper()} files')
+        cmd = [ffmpeg, '-y', '-loglevel', 'error',
+               '-f', 'rawvideo', '-pix_fmt', 'rgb24', '-s', f'{width}x{height}',
+               '-r', str(fps), '-i', '-']
+        if fmt == 'mp4':
+            cmd += ['-vcodec', 'libx264', '-pix_fmt', 'yuv420p',
+                    '-vf', 'pad=ceil(iw/2)*2:ceil(ih/2)*2']
+        cmd.append(path)
+        self.proc = subprocess.Popen(cmd, stdin=subprocess.PIPE)
+        
+    def write(self, data):
+        self.proc.stdin.write(data)
+        
+    def close(self):
+        self.proc.stdin.close()
+        if self.proc.wait() != 0:
+            raise RuntimeError(f'ffmpeg exited with status {self.proc.returncode}')
+
+
+class PillowGifSink:
+    # Fallback when ffmpeg is missing. Pillow can only save a GIF once it
+    # has every frame, so nothing is streamed: the quantized frames (one
+    # byte per pixel) are held in memory, up to max_bytes.
+    def __init__(self, path, fps, width, height, max_bytes=256 << 20):
+        self.path = path
+        self.duration = 1000 / fps
+        self.size = (width, height)
+        self.max_frames = max(1, max_bytes // (width * height))
+        self.frames = []
+        
+    def write(self, data):
+        from PIL import Image
+        
+        frame_bytes = self.size[0] * self.size[1] * 3
+        if len(self.frames) + len(data) // frame_bytes > self.max_frames:
+            self.frames = []  # so close() leaves no truncated file
+            raise RuntimeError(f'GIF export without ffmpeg keeps every frame in memory and '
+                               f'stops at {self.max_frames:,} frames; install ffmpeg, or '
+                               f'export PNG frames to a directory')
+        for offset in range(0, len(data), frame_bytes):
+            frame = Image.frombytes('RGB', self.size, data[offset:offset + frame_bytes])
+            self.frames.append(frame.quantize())
+            
+    def close(self):
+        if self.frames:
+            self.frames[0].save(self.path, save_all=True, append_images=self.frames[1:],
+                                duration=self.duration, loop=0)
+
+
+def export_run(name, array, path, fps=30, workers=None, chunk_frames=32,
+               figsize=(8, 4.5), dpi=100):
+    # Renders a whole run offline. path ending in .mp4/.gif is encoded as a
+    # video; a path without an extension, or ending in .png, is a directory
+    # of PNG frames.
+    fmt = os.path.splitext(path)[1].lstrip('.').lower() or 'png'
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f'cannot export to {path!r}: use a .mp4 or .gif file, '
+                         f'or a directory for PNG frames')
+    workers = workers or os.cpu_count() or 1
+    width, height = int(figsize[0] * dpi), int(figsize[1] * dpi)
+    ymax = max(110, max(array, default=0) * 1.1)
+    
+    frame_dir = None
+    sink = None
+    if fmt == 'png':
+        frame_dir = path
+        os.makedirs(frame_dir, exist_ok=True)
+    elif fmt == 'gif' and shutil.which('ffmpeg') is None:
+        sink = PillowGifSink(path, fps, width, height)
+    else:
+        sink = FFmpegSink(path, fmt, fps, width, height)
+        
+    frames = 0
+    
+    def drain(result):
+        count, data = result.get()
+        if sink is not None:
+            sink.write(data)
+        return count
+        
+    try:
+        with multiprocessing.Pool(workers, _init_export_worker,
+                                  (figsize, dpi, ymax, len(array))) as pool:
+            # Bound the rendered-but-unwritten frames kept in memory
+            pending = deque()
+            for start, tracker, events in export_chunks(name, array, chunk_frames):
+                pending.append(pool.apply_async(_render_export_chunk,
+                                                (start, tracker, events, frame_dir)))
+                if len(pending) >= 2 * workers:
+                    frames += drain(pending.popleft())
+            while pending:
+                frames += drain(pending.popleft())
+    finally:
+        if sink is not None:
+            sink.close()
+    return frames
+
+
+# Empirical complexity. A counting run consumes the step stream with no
+# tracker or drawing and tallies comparisons and writes; a second, smaller
+# run under tracemalloc records peak auxiliary memory. Counts over a sweep
+# of n are fitted against the candidate growth models by least squares in
+# log space, next to the complexity declared in `algorithms`.
+TIME_MODELS = {
+    'n': lambda n: n,
+    'n log n': lambda n: n * np.log2(n),
+    'n²': lambda n: n * n,
+}
+SPACE_MODELS = {
+    '1': lambda n: np.ones_like(n),
+    'log n': lambda n: np.log2(n),
+    'n': lambda n: n,
+}
+
+
+def count_operations(name, array):
+    counts = [0] * (OP_AUX_COMPARE + 1)
+    start = time.perf_counter()
+    for event in sort_generators[name](list(array)):
+        counts[event[0]] += 1
+    return {
+        'comparisons': counts[OP_COMPARE] + counts[OP_AUX_COMPARE],
+        'writes': 2 * counts[OP_SWAP] + counts[OP_WRITE] + counts[OP_AUX],
+        'steps': sum(counts),
+        'seconds': time.perf_counter() - start,
+    }
+
+
+def peak_memory(name, array):
+    # Bytes allocated by the run on top of its input copy
+    arr = list(array)
+    tracemalloc.start()
+    try:
+        for _ in sort_generators[name](arr):
+            pass
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+        
+        
+def fit_growth(ns, values, models):
+    # Log-log slope plus the best single-term model c * f(n)
+    ns = np.asarray(ns, dtype=float)
+    values = np.asarray(values, dtype=float)
+    keep = values > 0
+    ns, values = ns[keep], values[keep]
+    if len(ns) < 2:
+        return None
+    exponent = float(np.polyfit(np.log(ns), np.log(values), 1)[0])
+    best = None
+    for label, model in models.items():
+        f = np.maximum(model(ns), 1e-12)
+        # least squares on log(values) - log(c * f)
+        log_c = float(np.mean(np.log(values) - np.log(f)))
+        error = float(np.mean((np.log(values) - np.log(f) - log_c) ** 2))
+        if best is None or error < best['error']:
+            best = {'model': label, 'constant': float(np.exp(log_c)), 'error': error}
+    return {'exponent': exponent, **best}
+
+
+def analyze_complexity(name, max_n=100000, max_n_quadratic=3000, memory_max_n=100000,
+                       distribution='uniform', seed=0, points=7):
+    # Sweeps n geometrically from 100 up to max_n (max_n_quadratic for
+    # algorithms declared O(n²)) and returns the samples plus the fits
+    declared = algorithms[name]
+    top = max_n_quadratic if 'n²' in declared['time'] else max_n
+    sizes = sorted(set(np.geomspace(100, max(top, 100), points).astype(int).tolist()))
+    samples = []
+    for n in sizes:
+        array = generate_input(distribution, n, seed).tolist()
+        sample = {'n': n, **count_operations(name, array)}
+        if n <= memory_max_n:
+            sample['peak_bytes'] = peak_memory(name, array)
+        samples.append(sample)
+        
+    ns = [s['n'] for s in samples]
+    operations = [s['comparisons'] + s['writes'] for s in samples]
+    memory = [s for s in samples if 'peak_bytes' in s]
+    return {
+        'algorithm': name,
+        'distribution': distribution,
+        'seed': seed,
+        'declared': {'time': declared['time'], 'space': declared['space'],
+                     'best': declared['best']},
+        'samples': samples,
+        'fits': {
+            'comparisons': fit_growth(ns, [s['comparisons'] for s in samples], TIME_MODELS),
+            'writes': fit_growth(ns, [s['writes'] for s in samples], TIME_MODELS),
+            'operations': fit_growth(ns, operations, TIME_MODELS),
+            'memory': fit_growth([s['n'] for s in memory],
+                                 [s['peak_bytes'] for s in memory], SPACE_MODELS),
+        },
+    }
+
+
+def format_analysis(result):
+    lines = []
+    fits = result['fits']
+    largest = result['samples'][-1]['n']
+    ops = fits['operations']
+    if ops:
+        lines.append(f"Time  {result['declared']['time']:>10}  measured "
+                     f"{ops['constant']:.2g}·{ops['model']}  (n^{ops['exponent']:.2f})")
+    mem = fits['memory']
+    if mem:
+        lines.append(f"Space {result['declared']['space']:>10}  measured "
+                     f"{mem['constant']:.2g}·{mem['model']} B  (n^{mem['exponent']:.2f})")
+    lines.append(f"{result['distribution']} input, n = 100..{largest:,}")
+    return '\n'.join(lines)
+
+
+def export_analysis(results, path):
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=2)
+
+
+# Benchmarks. Two numbers are measured separately for every algorithm,
+# size and input distribution: raw step throughput of the generator plus
+# StateTracker with no drawing at all, and end-to-end frames per second
+# through SortingVisualizer.update_bars() on the Agg backend, one step per
+# frame. Results are plain JSON so a run can be compared with a baseline.
+BENCH_SIZES = (100, 1000, 10000)
+BENCH_DISTRIBUTIONS = ('uniform', 'sorted', 'few unique')
+BENCH_RENDER_SIZES = (50, 1000, 100000)
+
+
+def bench_steps(name, array, max_seconds=2.0):
+    # Quadratic sorts on big inputs are cut off after max_seconds; the rate
+    # is still meaningful and 'complete' records whether the run finished
+    tracker = StateTracker(list(array))
+    apply = tracker.apply
+    generator = sort_generators[name](list(array))
+    complete = True
+    start = time.perf_counter()
+    deadline = start + max_seconds
+    for event in generator:
+        apply(event)
+        if not tracker.steps & 1023 and time.perf_counter() > deadline:
+            complete = False
+            break
+    seconds = time.perf_counter() - start
+    return {
+        'steps': tracker.steps,
+        'seconds': seconds,
+        'steps_per_second': tracker.steps / seconds if seconds else 0.0,
+        'complete': complete,
+    }
+
+
+def bench_render(visualizer, name, array, frames=100):
+    large = len(array) > LARGE_ARRAY_THRESHOLD
+    visualizer.array = np.array(array) if large else list(array)
+    visualizer.tracker = StateTracker(visualizer.array)
+    visualizer.use_renderer(len(array))
+    visualizer.renderer.reset(visualizer.array, visualizer.tracker.state)
+    visualizer.fig.canvas.draw()
+    generator = sort_generators[name](list(array))
+    tracker = visualizer.tracker
+    drawn = 0
+    start = time.perf_counter()
+    for event in generator:
+        tracker.apply(event)
+        visualizer.set_step(tracker.text)
+        visualizer.update_bars()
+        drawn += 1
+        if drawn == frames:
+            break
+    seconds = time.perf_counter() - start
+    return {
+        'frames': drawn,
+        'seconds': seconds,
+        'fps': drawn / seconds if seconds else 0.0,
+    }
+
+
+def bench_startup(command, repeat=3):
+    # Best of `repeat` cold starts of a CLI command in a fresh interpreter.
+    # --startup-only makes the command exit once it is ready to work, and
+    # the Agg backend lets 'gui' build its window without a display.
+    argv = [sys.executable, os.path.abspath(__file__), command,
+            *BENCH_STARTUP_ARGS[command], '--startup-only']
+    env = dict(os.environ, MPLBACKEND='Agg')
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        proc = subprocess.run(argv, env=env, capture_output=True, text=True, check=True)
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+    return {'seconds': best, **json.loads(proc.stdout.splitlines()[-1])}
+
+
+def run_benchmarks(names=None, sizes=BENCH_SIZES, distributions=BENCH_DISTRIBUTIONS,
+                   render_sizes=BENCH_RENDER_SIZES, seed=0, frames=100, max_seconds=2.0,
+                   render=True, startup=True):
+    import matplotlib
+    
+    names = list(names or sort_generators)
+    results = []
+    for name in names:
+        for distribution in distributions:
+            for n in sizes:
+                array = generate_input(distribution, n, seed).tolist()
+                results.append({'kind': 'steps', 'algorithm': name,
+                                'distribution': distribution, 'n': n,
+                                **bench_steps(name, array, max_seconds)})
+                
+    if render:
+        import matplotlib.pyplot as plt
+        
+        plt.switch_backend('Agg')
+        visualizer = SortingVisualizer()
+        for name in names:
+            for n in render_sizes:
+                array = generate_input('uniform', n, seed).tolist()
+                results.append({'kind': 'render', 'algorithm': name,
+                                'distribution': 'uniform', 'n': n,
+                                **bench_render(visualizer, name, array, frames)})
+        plt.close(visualizer.fig)
+        
+    if startup:
+        for command in CLI_COMMANDS:
+            results.append({'kind': 'startup', 'algorithm': command,
+                            'distribution': '-', 'n': 0, **bench_startup(command)})
+    
+    return {
+        'meta': {
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'numpy': np.__version__,
+            'matplotlib': matplotlib.__version__,
+            'seed': seed,
+        },
+        'results': results,
+    }
+
+
+def compare_benchmarks(current, baseline, tolerance=0.1):
+    # Rows for every case present in both runs; a case regresses when its
+    # rate drops by more than `tolerance` relative to the baseline
+    def key(row):
+        return row['kind'], row['algorithm'], row['distribution'], row['n']
+        
+    def rate(row):
+        if row['kind'] == 'startup':
+            return 1 / row['seconds']
+        return row['fps'] if row['kind'] == 'render' else row['steps_per_second']
+        
+    base = {key(row): row for row in baseline['results']}
+    rows = []
+    for row in current['results']:
+        old = base.get(key(row))
+        if old is None or not rate(old):
+            continue
+        ratio = rate(row) / rate(old)
+        rows.append({'kind': row['kind'], 'algorithm': row['algorithm'],
+                     'distribution': row['distribution'], 'n': row['n'],
+                     'baseline': rate(old), 'current': rate(row), 'ratio': ratio,
+                     'regression': ratio < 1 - tolerance})
+    return rows
+
+
+def print_benchmarks(report, comparison=None):
+    unit = {'steps': 'steps/s', 'render': 'fps', 'startup': 'ms'}
+    for row in report['results']:
+        if row['kind'] == 'startup':
+            value = row['seconds'] * 1000
+        else:
+            value = row['fps'] if row['kind'] == 'render' else row['steps_per_second']
+        print(f"{row['kind']:6s} {row['algorithm']:20s} {row['distribution']:14s} "
+              f"{row['n']:>8}  {value:14,.1f} {unit[row['kind']]}")
+    for row in comparison or ():
+        flag = 'REGRESSION' if row['regression'] else ''
+        print(f"{row['kind']:6s} {row['algorithm']:20s} {row['distribution']:14s} "
+              f"{row['n']:>8}  x{row['ratio']:.2f}  {flag}")
+
+
+def benchmark_main(out_path, baseline_path=None, render=True, startup=True):
+    report = run_benchmarks(render=render, startup=startup)
+    with open(out_path, 'w') as f:
+        json.dump(report, f, indent=2)
+    comparison = None
+    if baseline_path:
+        with open(baseline_path) as f:
+            comparison = compare_benchmarks(report, json.load(f))
+    print_benchmarks(report, comparison)
+    return 1 if comparison and any(row['regression'] for row in comparison) else 0
+
+
+# Trace server. Serves recorded traces over HTTP to a canvas player that
+# runs in the browser at the display refresh rate, so large arrays play
+# smoothly and any number of viewers can stream the same run. The player
+# fetches the header, input and text table first and then the records in
+# chunks with Range requests. Traces are recorded once per
+# (algorithm, distribution, seed, n) and kept in a TraceCache.
+SERVER_MAX_BYTES = 256 << 20
+
+
+class TraceCache:
+    # Trace files on disk keyed by (algorithm, distribution, seed, n) and
+    # evicted least recently used once they add up to more than max_bytes.
+    # A request for a trace that is still being recorded waits for that
+    # recording instead of starting another one.
+    def __init__(self, directory, max_bytes=SERVER_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.pending = {}
+        self.lock = threading.Lock()
+        self.bytes = 0
+        self.recorded = 0
+        self.hits = 0
+        
+    def open(self, key):
+        # Returns the trace opened for reading; an open file stays readable
+        # when eviction unlinks it mid-response
+        while True:
+            with self.lock:
+                entry = self.entries.get(key)
+                if entry is not None:
+                    self.entries.move_to_end(key)
+                    self.hits += 1
+                    return open(entry[0], 'rb')
+                done = self.pending.get(key)
+                if done is None:
+                    done = self.pending[key] = threading.Event()
+                    self.recorded += 1
+                    path = os.path.join(self.directory, f'trace-{self.recorded}.svtr')
+                    break
+            done.wait()
+            
+        try:
+            algorithm, distribution, seed, n = key
+            try:
+                record_trace(algorithm, generate_input(distribution, n, seed).tolist(), path)
+            except BaseException:
+                if os.path.exists(path):
+                    os.remove(path)
+                raise
+            size = os.path.getsize(path)
+            with self.lock:
+                self.entries[key] = (path, size)
+                self.bytes += size
+                trace = open(path, 'rb')
+                # The newest trace stays even when it alone is over the limit
+                while self.bytes > self.max_bytes and len(self.entries) > 1:
+                    _, (old_path, old_size) = self.entries.popitem(last=False)
+                    self.bytes -= old_size
+                    try:
+                        os.remove(old_path)
+                    except OSError:
+                        pass
+            return trace
+        finally:
+            with self.lock:
+                del self.pending[key]
+            done.set()
+            
+            
+def parse_byte_range(header, size):
+    # Half-open (start, end) span of a single 'bytes=' range, or None to send
+    # the whole body (no header, several ranges or a malformed one). Raises
+    # ValueError when the range is valid but lies past the end.
+    if not header or not header.startswith('bytes=') or ',' in header:
+        return None
+    first, _, last = header[len('bytes='):].strip().partition('-')
+    try:
+        if first:
+            start = int(first)
+            end = int(last) + 1 if last else size
+            if last and end <= start:
+                return None
+        else:
+            start, end = size - int(last), size
+    except ValueError:
+        return None
+    start, end = max(start, 0), min(end, size)
+    if start >= end:
+        raise ValueError(f'range {header!r} not satisfiable for {size} bytes')
+    return start, end
+
+
+def trace_key(query, max_size=100000, max_size_quadratic=3000):
+    # Validates /trace query parameters into a TraceCache key
+    def single(name):
+        values = query.get(name)
+        if not values:
+            raise ValueError(f'missing {name}')
+        return values[0]
+        
+    algorithm = single('algorithm')
+    distribution = single('distribution')
+    if algorithm not in sort_generators:
+        raise ValueError(f'unknown algorithm {algorithm!r}')
+    if distribution not in DISTRIBUTIONS:
+        raise ValueError(f'unknown distribution {distribution!r}')
+    seed, n = int(single('seed')), int(single('n'))
+    limit = max_size_quadratic if algorithms[algorithm]['expensive'] else max_size
+    if not 0 <= seed < 2 ** 32 or not 1 <= n <= limit:
+        raise ValueError(f'seed must be in [0, 2^32) and n in [1, {limit}] for {algorithm}')
+    return algorithm, distribution, seed, n
+
+
+TRACE_PLAYER_HTML = '''<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>Sorting Visualizer</title>
+<style>
+  body { margin: 0; background: __BG__; color: #e5e7eb; font: 13px sans-serif; }
+  header { display: flex; gap: 10px; align-items: center; padding: 8px 12px; background: __PANEL__; }
+  select, input, button { background: __BG__; color: #e5e7eb; border: 1px solid #4b5563; padding: 3px; }
+  input { width: 80px; }
+  #text { padding: 6px 12px; height: 18px; color: #fde047; }
+  #status { margin-left: auto; color: #9ca3af; }
+  canvas { display: block; width: 100vw; height: calc(100vh - 80px); }
+</style>
+</head>
+<body>
+<header>
+  <select id="algorithm"></select>
+  <select id="distribution"></select>
+  <label>n <input id="n" type="number" value="2000" min="1"></label>
+  <label>seed <input id="seed" type="number" min="0" placeholder="random"></label>
+  <label>steps/s <input id="rate" type="number" value="5000" min="1"></label>
+  <button id="load">Load</button>
+  <button id="pause">Pause</button>
+  <span id="status"></span>
+</header>
+<div id="text"></div>
+<canvas id="canvas"></canvas>
+<script>
+// Mirrors StateTracker and DecimatedRenderer in sorting-visualizer-python.py
+const ALGORITHMS = __ALGORITHMS__;
+const DISTRIBUTIONS = __DISTRIBUTIONS__;
+const OP = __OPS__;
+const STATE = __STATES__;
+const PALETTE = __PALETTE__;
+const AUX_PALETTE = [__AUX_COLOR__, ...PALETTE.slice(1)];
+const STATE_PRIORITY = __STATE_PRIORITY__;
+const HEADER_SIZE = __HEADER_SIZE__, RECORD_SIZE = __RECORD_SIZE__, CHUNK = __CHUNK__;
+const ENVELOPE_ALPHA = __ENVELOPE_ALPHA__ / 255;
+
+const $ = id => document.getElementById(id);
+const canvas = $('canvas'), ctx = canvas.getContext('2d');
+let run = null, paused = false, last = null;
+
+for (const name of ALGORITHMS) $('algorithm').add(new Option(name, name, false, name === 'Quick Sort'));
+for (const name of DISTRIBUTIONS) $('distribution').add(new Option(name));
+
+async function fetchRange(url, start, end) {
+  // end is exclusive; undefined reads to the end of the file
+  const range = end === undefined ? `bytes=${start}-` : `bytes=${start}-${end - 1}`;
+  const response = await fetch(url, {headers: {Range: range}});
+  if (!response.ok) throw new Error(await response.text() || response.statusText);
+  return new DataView(await response.arrayBuffer());
+}
+
+async function load() {
+  const seed = $('seed').value === '' ? Math.floor(Math.random() * 2 ** 31) : $('seed').value;
+  const url = '/trace?' + new URLSearchParams({
+    algorithm: $('algorithm').value, distribution: $('distribution').value, n: $('n').value, seed});
+  run = null;
+  $('status').textContent = 'Recording trace...';
+  try {
+    const head = await fetchRange(url, 0, HEADER_SIZE);
+    const n = head.getUint32(8, true);
+    const steps = Number(head.getBigUint64(12, true));
+    const textsOffset = Number(head.getBigUint64(20, true));
+    const [input, table] = await Promise.all([
+      fetchRange(url, HEADER_SIZE, HEADER_SIZE + 4 * n), fetchRange(url, textsOffset)]);
+    const texts = [], decoder = new TextDecoder();
+    for (let i = 0, offset = 4; i < table.getUint32(0, true); i++) {
+      const length = table.getUint32(offset, true);
+      texts.push(decoder.decode(new Uint8Array(table.buffer, offset + 4, length)));
+      offset += 4 + length;
+    }
+    const values = new Int32Array(n);
+    for (let i = 0; i < n; i++) values[i] = input.getInt32(4 * i, true);
+    run = {url, n, steps, texts, values, recordsOffset: HEADER_SIZE + 4 * n,
+           ymax: Math.max(110, 1.1 * values.reduce((a, b) => Math.max(a, b), 0)),
+           base: new Uint8Array(n), state: new Uint8Array(n), aux: null, auxState: null,
+           highlighted: [], auxHighlighted: [],
+           text: `Input: ${$('distribution').value}, seed ${seed}`, position: 0, budget: 0,
+           chunks: new Map()};
+  } catch (error) {
+    $('status').textContent = error.message;
+  }
+}
+
+function request(r, k) {
+  // Starts fetching record chunk k unless it is past the end or under way
+  if (k * CHUNK >= r.steps || r.chunks.has(k)) return;
+  r.chunks.set(k, null);
+  fetchRange(r.url, r.recordsOffset + k * CHUNK * RECORD_SIZE,
+             r.recordsOffset + Math.min((k + 1) * CHUNK, r.steps) * RECORD_SIZE).then(
+    view => r.chunks.set(k, view),
+    error => { r.chunks.delete(k); $('status').textContent = error.message; });
+}
+
+function apply(r, view, offset) {
+  const op = view.getUint8(offset), a = view.getInt32(offset + 1, true);
+  const b = view.getInt32(offset + 5, true), text = view.getInt32(offset + 9, true);
+  for (const i of r.highlighted) r.state[i] = r.base[i];
+  for (const i of r.auxHighlighted) r.auxState[i] = STATE.UNSORTED;
+  r.highlighted = [];
+  r.auxHighlighted = [];
+  if (op === OP.COMPARE) {
+    r.state[a] = r.state[b] = STATE.COMPARING;
+    r.highlighted = [a, b];
+  } else if (op === OP.SWAP) {
+    [r.values[a], r.values[b]] = [r.values[b], r.values[a]];
+    r.state[a] = r.state[b] = STATE.SWAPPING;
+    r.highlighted = [a, b];
+  } else if (op === OP.WRITE) {
+    r.values[a] = b;
+    r.state[a] = STATE.SWAPPING;
+    r.highlighted = [a];
+  } else if (op === OP.SORTED) {
+    r.base.fill(STATE.SORTED, a, b);
+    r.state.fill(STATE.SORTED, a, b);
+  } else if (op === OP.AUX) {
+    if (r.aux === null) {
+      r.aux = new Int32Array(r.n);
+      r.auxState = new Uint8Array(r.n);
+    }
+    r.aux[a] = b;
+  } else if (op === OP.WORKER) {
+    r.base[a] = r.state[a] = STATE.WORKER + b % STATE.WORKERS;
+  } else if (op === OP.READ) {
+    r.state[a] = STATE.COMPARING;
+    r.highlighted = [a];
+  } else if (op === OP.AUX_COMPARE) {
+    r.state[b] = r.auxState[a] = STATE.COMPARING;
+    r.highlighted = [b];
+    r.auxHighlighted = [a];
+  }
+  if (text >= 0) r.text = [text, view.getInt32(offset + 13, true), view.getInt32(offset + 17, true)];
+}
+
+function formatStep(r) {
+  // Fills a template's {} fields in order, like str.format in format_step()
+  if (typeof r.text === 'string') return r.text;
+  const [text, x, y] = r.text, args = [x, y];
+  let next = 0;
+  return r.texts[text].replace(/\\{\\{|\\}\\}|\\{\\}/g, field => field === '{}' ? args[next++] : field[0]);
+}
+
+function advance(r, count) {
+  // Applies up to count events and returns how many were available
+  let applied = 0;
+  while (applied < count && r.position < r.steps) {
+    const k = Math.floor(r.position / CHUNK);
+    request(r, k);
+    request(r, k + 1);
+    const view = r.chunks.get(k);
+    if (!view) break;
+    const records = view.byteLength / RECORD_SIZE;
+    const lo = r.position - k * CHUNK, hi = Math.min(records, lo + count - applied);
+    for (let i = lo; i < hi; i++) apply(r, view, i * RECORD_SIZE);
+    applied += hi - lo;
+    r.position += hi - lo;
+    if (hi === records) r.chunks.delete(k);
+  }
+  return applied;
+}
+
+function drawBars(values, states, palette, top, height, ymax) {
+  // One column per bar, or per pixel when there are more bars than pixels:
+  // solid up to the smallest bar in the column, translucent up to the tallest
+  const n = values.length, columns = Math.min(n, canvas.width);
+  const width = canvas.width / columns, gap = width > 3 ? 1 : 0;
+  for (let c = 0; c < columns; c++) {
+    const lo = Math.floor(c * n / columns), hi = Math.floor((c + 1) * n / columns);
+    let min = Infinity, max = 0, priority = -1, state = STATE.UNSORTED;
+    for (let i = lo; i < hi; i++) {
+      min = Math.min(min, values[i]);
+      max = Math.max(max, values[i]);
+      if (STATE_PRIORITY[states[i]] > priority) {
+        priority = STATE_PRIORITY[states[i]];
+        state = states[i];
+      }
+    }
+    ctx.fillStyle = palette[state];
+    const low = min / ymax * height, high = max / ymax * height;
+    ctx.fillRect(c * width, top + height - low, width - gap, low);
+    if (high > low) {
+      ctx.globalAlpha = ENVELOPE_ALPHA;
+      ctx.fillRect(c * width, top + height - high, width - gap, high - low);
+      ctx.globalAlpha = 1;
+    }
+  }
+}
+
+function frame(now) {
+  if (run && !paused && last !== null) {
+    run.budget += Math.max(1, $('rate').valueAsNumber || 1) * (now - last) / 1000;
+    // A stall on the network does not turn into a burst afterwards
+    run.budget = Math.min(run.budget - advance(run, Math.floor(run.budget)), CHUNK);
+  }
+  last = now;
+  const width = Math.round(canvas.clientWidth * devicePixelRatio);
+  const height = Math.round(canvas.clientHeight * devicePixelRatio);
+  if (canvas.width !== width || canvas.height !== height) {
+    canvas.width = width;
+    canvas.height = height;
+  }
+  ctx.fillStyle = '__PANEL__';
+  ctx.fillRect(0, 0, width, height);
+  if (run) {
+    const bars = run.aux ? Math.round(height * 0.72) : height;
+    drawBars(run.values, run.state, PALETTE, 0, bars, run.ymax);
+    if (run.aux) drawBars(run.aux, run.auxState, AUX_PALETTE, bars + 8, height - bars - 8, run.ymax);
+    $('text').textContent = formatStep(run);
+    $('status').textContent = `Step ${run.position.toLocaleString()} / ${run.steps.toLocaleString()}`;
+  }
+  requestAnimationFrame(frame);
+}
+
+$('load').onclick = load;
+$('pause').onclick = () => {
+  paused = !paused;
+  $('pause').textContent = paused ? 'Resume' : 'Pause';
+};
+requestAnimationFrame(frame);
+</script>
+</body>
+</html>
+'''
+
+
+def trace_player_page():
+    colors = SortingVisualizer
+    values = {
+        '__BG__': colors.COLOR_BG,
+        '__PANEL__': colors.COLOR_PANEL,
+        '__ALGORITHMS__': json.dumps(list(sort_generators)),
+        '__DISTRIBUTIONS__': json.dumps(list(DISTRIBUTIONS)),
+        '__OPS__': json.dumps({'COMPARE': OP_COMPARE, 'SWAP': OP_SWAP, 'WRITE': OP_WRITE,
+                               'SORTED': OP_SORTED, 'AUX': OP_AUX, 'WORKER': OP_WORKER,
+                               'READ': OP_READ, 'AUX_COMPARE': OP_AUX_COMPARE}),
+        '__STATES__': json.dumps({'UNSORTED': STATE_UNSORTED, 'COMPARING': STATE_COMPARING,
+                                  'SWAPPING': STATE_SWAPPING, 'SORTED': STATE_SORTED,
+                                  'WORKER': STATE_WORKER, 'WORKERS': WORKER_STATES}),
+        '__PALETTE__': json.dumps(list(colors.palette)),
+        '__AUX_COLOR__': json.dumps(colors.aux_palette[0]),
+        '__STATE_PRIORITY__': json.dumps(DecimatedRenderer.STATE_PRIORITY.tolist()),
+        '__HEADER_SIZE__': str(TRACE_HEADER.size),
+        '__RECORD_SIZE__': str(TRACE_RECORD.size),
+        '__CHUNK__': str(TRACE_CHUNK),
+        '__ENVELOPE_ALPHA__': str(DecimatedRenderer.ENVELOPE_ALPHA),
+    }
+    page = TRACE_PLAYER_HTML
+    for placeholder, value in values.items():
+        page = page.replace(placeholder, value)
+    return page.encode('utf-8')
+
+
+def make_trace_server(cache, host='127.0.0.1', port=8000, max_size=100000,
+                      max_size_quadratic=3000):
+    # http.server is imported here so the other commands start without it
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from urllib.parse import parse_qs, urlsplit
+    
+    page = trace_player_page()
+    
+    class TraceRequestHandler(BaseHTTPRequestHandler):
+        # Errors go to the player as plain text it can show as is
+        error_message_format = '%(explain)s'
+        error_content_type = 'text/plain; charset=utf-8'
+        
+        def do_GET(self):
+            self.respond(send_body=True)
+            
+        def do_HEAD(self):
+            self.respond(send_body=False)
+            
+        def respond(self, send_body):
+            url = urlsplit(self.path)
+            if url.path == '/':
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(page)))
+                self.end_headers()
+                if send_body:
+                    self.wfile.write(page)
+            elif url.path == '/trace':
+                try:
+                    key = trace_key(parse_qs(url.query), max_size, max_size_quadratic)
+                except ValueError as e:
+                    self.send_error(400, explain=str(e))
+                    return
+                try:
+                    trace = cache.open(key)
+                except Exception as e:
+                    self.send_error(500, explain=f'recording failed: {e}')
+                    return
+                with trace:
+                    self.send_trace(trace, send_body)
+            else:
+                self.send_error(404)
+                
+        def send_trace(self, trace, send_body):
+            size = os.fstat(trace.fileno()).st_size
+            try:
+                span = parse_byte_range(self.headers.get('Range'), size)
+            except ValueError:
+                self.send_response(416)
+                self.send_header('Content-Range', f'bytes */{size}')
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            if span is None:
+                start, end = 0, size
+                self.send_response(200)
+            else:
+                start, end = span
+                self.send_response(206)
+                self.send_header('Content-Range', f'bytes {start}-{end - 1}/{size}')
+            self.send_header('Content-Type', 'application/octet-stream')
+            self.send_header('Content-Length', str(end - start))
+            self.send_header('Accept-Ranges', 'bytes')
+            # A key always records the same trace
+            self.send_header('Cache-Control', 'public, max-age=86400, immutable')
+            self.end_headers()
+            if not send_body:
+                return
+            trace.seek(start)
+            remaining = end - start
+            try:
+                while remaining:
+                    data = trace.read(min(remaining, 1 << 16))
+                    if not data:
+                        break
+                    self.wfile.write(data)
+                    remaining -= len(data)
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+                
+        def log_message(self, format, *args):
+            # Players fetch in many small ranges; only errors are worth a line
+            pass
+            
+        def log_error(self, format, *args):
+            super().log_message(format, *args)
+            
+    return ThreadingHTTPServer((host, port), TraceRequestHandler)
+
+
+# Command line. Each command imports only what it needs: the headless
+# ones never load pyplot or the widgets, and the window is only built by
+# 'gui'. --startup-only exits as soon as a command is ready to work and
+# prints which heavy modules got imported; bench_startup() times it.
+CLI_COMMANDS = ('gui', 'bench', 'trace', 'export', 'analyze', 'external', 'serve')
+# Placeholder positionals so --startup-only runs parse
+BENCH_STARTUP_ARGS = {
+    'gui': [],
+    'bench': ['bench.json'],
+    'trace': ['run.svtr'],
+    'export': ['run.gif'],
+    'analyze': [],
+    'external': ['keys.bin'],
+    'serve': [],
+}
+
+
+def cli_input(args):
+    seed = args.seed if args.seed is not None else random.randrange(2 ** 31)
+    return generate_input(args.distribution, args.size, seed).tolist()
+
+
+def cli_gui(args):
     visualizer = SortingVisualizer()
+    if args.startup_only:
+        visualizer.fig.canvas.draw()
+        return 0
+    if args.trace:
+        visualizer.replay_trace(args.trace)
     visualizer.run()
+    return 0
+
+
+def cli_bench(args):
+    if args.startup_only:
+        return 0
+    return benchmark_main(args.out, args.baseline, render=not args.no_render,
+                          startup=not args.no_startup)
+
+
+def cli_trace(args):
+    array = cli_input(args)
+    if args.startup_only:
+        return 0
+    steps = record_trace(args.algorithm, array, args.path)
+    print(f'{args.algorithm}: {steps:,} steps written to {args.path}')
+    return 0
+
+
+def cli_export(args):
+    array = cli_input(args)
+    if args.startup_only:
+        return 0
+    frames = export_run(args.algorithm, array, args.path, fps=args.fps, workers=args.workers)
+    print(f'{args.algorithm}: {frames:,} frames written to {args.path}')
+    return 0
+
+
+def cli_analyze(args):
+    names = args.algorithm or list(sort_generators)
+    if args.startup_only:
+        return 0
+    results = []
+    for name in names:
+        result = analyze_complexity(name, max_n=args.max_n, max_n_quadratic=args.max_n_quadratic,
+                                    memory_max_n=args.memory_max_n,
+                                    distribution=args.distribution, seed=args.seed or 0)
+        print(name)
+        print(format_analysis(result))
+        if args.speedup and name in PARALLEL_METHODS:
+            result['speedup'] = measure_speedup(PARALLEL_METHODS[name], args.speedup,
+                                                seed=args.seed or 0)
+            for row in result['speedup']:
+                print(f"{row['workers']:>3} workers {row['parallel_seconds'] * 1000:9.1f} ms  "
+                      f"1 core {row['serial_seconds'] * 1000:9.1f} ms  x{row['speedup']:.2f}")
+        results.append(result)
+    if args.json:
+        export_analysis(results, args.json)
+    return 0
+
+
+def cli_external(args):
+    if args.startup_only:
+        return 0
+    if args.generate is not None:
+        write_external_input(args.input, args.generate, args.seed, high=2 ** 62)
+    stats = {}
+    for event in external_sort(args.input, args.output, args.memory << 20, args.block << 10,
+                               args.fan_in, visual=False, stats=stats):
+        if event[3] is not None:
+            print(format_step(event[3]))
+    for row in stats.get('passes', ()):
+        print(f"pass {row['pass']}: {row['runs']:>6} runs  "
+              f"read {row['bytes_read'] / 2 ** 20:9.1f} MiB  "
+              f"written {row['bytes_written'] / 2 ** 20:9.1f} MiB  {row['seconds']:7.2f} s")
+    return 0
+
+
+def cli_serve(args):
+    if args.startup_only:
+        return 0
+    with tempfile.TemporaryDirectory(prefix='sorting-visualizer-') as directory:
+        cache = TraceCache(directory, args.cache_mb << 20)
+        server = make_trace_server(cache, args.host, args.port, args.max_size,
+                                   args.max_size_quadratic)
+        print(f'Serving the trace player on http://{args.host}:{server.server_port}/ '
+              f'(Ctrl+C to stop)')
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+        print(f'{cache.recorded} trace(s) recorded, {cache.hits} served from the cache')
+    return 0
+
+
+def make_parser():
+    parser = argparse.ArgumentParser(
+        prog=os.path.basename(__file__),
+        description='Sorting algorithm visualizer. Without a command the GUI is started.')
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--startup-only', action='store_true',
+                        help='exit once the command is ready to run (for startup timing)')
+    inputs = argparse.ArgumentParser(add_help=False)
+    inputs.add_argument('--size', '-n', type=int, default=25)
+    inputs.add_argument('--distribution', '-d', choices=DISTRIBUTIONS, default='uniform')
+    inputs.add_argument('--seed', '-s', type=int)
+    commands = parser.add_subparsers(dest='command', metavar='COMMAND')
+    
+    gui = commands.add_parser('gui', parents=[common], help='interactive visualizer')
+    gui.add_argument('trace', nargs='?', help='trace file to replay')
+    gui.set_defaults(handler=cli_gui)
+    
+    bench = commands.add_parser('bench', parents=[common], help='benchmark suite')
+    bench.add_argument('out', help='JSON report to write')
+    bench.add_argument('baseline', nargs='?', help='earlier report to compare against')
+    bench.add_argument('--no-render', action='store_true',
+                       help='skip the frame rate cases, which need pyplot')
+    bench.add_argument('--no-startup', action='store_true', help='skip the cold-start cases')
+    bench.set_defaults(handler=cli_bench)
+    
+    trace = commands.add_parser('trace', parents=[common, inputs], help='record a trace file')
+    trace.add_argument('path')
+    trace.add_argument('--algorithm', '-a', choices=sort_generators, default='Bubble Sort')
+    trace.set_defaults(handler=cli_trace)
+    
+    export = commands.add_parser('export', parents=[common, inputs],
+                                 help='render a run to MP4, GIF or PNG frames')
+    export.add_argument('path', help='.mp4 or .gif file, or a directory for PNG frames')
+    export.add_argument('--algorithm', '-a', choices=sort_generators, default='Bubble Sort')
+    export.add_argument('--fps', type=int, default=30)
+    export.add_argument('--workers', type=int)
+    export.set_defaults(handler=cli_export)
+    
+    analyze = commands.add_parser('analyze', parents=[common],
+                                  help='fit measured growth against Big-O models')
+    analyze.add_argument('--algorithm', '-a', choices=sort_generators, action='append',
+                         help='may be repeated; defaults to every algorithm')
+    analyze.add_argument('--distribution', '-d', choices=DISTRIBUTIONS, default='uniform')
+    analyze.add_argument('--seed', '-s', type=int)
+    analyze.add_argument('--max-n', type=int, default=100000)
+    analyze.add_argument('--max-n-quadratic', type=int, default=3000)
+    analyze.add_argument('--memory-max-n', type=int, default=100000)
+    analyze.add_argument('--speedup', type=int, metavar='N',
+                         help='for the parallel sorts, also time each worker count on N keys')
+    analyze.add_argument('--json', help='also write the raw measurements here')
+    analyze.set_defaults(handler=cli_analyze)
+    
+    external = commands.add_parser('external', parents=[common],
+                                   help='sort a file of int64 keys within a memory budget')
+    external.add_argument('input', help='little-endian int64 keys')
+    external.add_argument('output', nargs='?', help='sorted keys; omitted, only the I/O is reported')
+    external.add_argument('--memory', type=int, default=64, help='memory budget in MiB')
+    external.add_argument('--block', type=int, default=1024, help='block size in KiB')
+    external.add_argument('--fan-in', type=int, help='runs merged per group')
+    external.add_argument('--generate', type=int, metavar='N',
+                          help='first write N random keys to INPUT')
+    external.add_argument('--seed', '-s', type=int)
+    external.set_defaults(handler=cli_external)
+    
+    serve = commands.add_parser('serve', parents=[common],
+                                help='serve traces to a browser player over HTTP')
+    serve.add_argument('--host', default='127.0.0.1')
+    serve.add_argument('--port', type=int, default=8000)
+    serve.add_argument('--cache-mb', type=int, default=SERVER_MAX_BYTES >> 20,
+                       help='evict least recently used traces above this size')
+    serve.add_argument('--max-size', type=int, default=100000)
+    serve.add_argument('--max-size-quadratic', type=int, default=3000,
+                       help='size limit for expensive algorithms (O(n²) worst case, Shell Sort)')
+    serve.set_defaults(handler=cli_serve)
+    return parser
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    # Bare invocations and a lone trace path still start the GUI
+    if not argv or (argv[0] not in CLI_COMMANDS and argv[0] not in ('-h', '--help')):
+        argv = ['gui', *argv]
+    args = make_parser().parse_args(argv)
+    status = args.handler(args)
+    if args.startup_only:
+        print(json.dumps({'pyplot': 'matplotlib.pyplot' in sys.modules,
+                          'widgets': 'matplotlib.widgets' in sys.modules}))
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,17 @@
+import importlib.util
+import pathlib
+import sys
+
+import pytest
+
+SCRIPT = pathlib.Path(__file__).resolve().parent.parent / 'sorting-visualizer-python.py'
+
+
+@pytest.fixture(scope='session')
+def sv():
+    # The script's file name has hyphens, so it is imported by path
+    spec = importlib.util.spec_from_file_location('sorting_visualizer', SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
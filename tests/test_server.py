@@ -0,0 +1,64 @@
+import pytest
+
+
+SIZE = 1000
+
+
+@pytest.mark.parametrize('header, span', [
+    ('bytes=0-99', (0, 100)),
+    ('bytes=100-199', (100, 200)),
+    ('bytes=990-5000', (990, SIZE)),
+    # Open-ended
+    ('bytes=500-', (500, SIZE)),
+    ('bytes=0-', (0, SIZE)),
+    # Suffix: the last N bytes, all of them when N exceeds the size
+    ('bytes=-100', (900, SIZE)),
+    ('bytes=-5000', (0, SIZE)),
+])
+def test_single_range(sv, header, span):
+    assert sv.parse_byte_range(header, SIZE) == span
+    
+    
+@pytest.mark.parametrize('header', [
+    None,
+    '',
+    'items=0-10',
+    # Several ranges are answered with the whole body
+    'bytes=0-9,20-29',
+    'bytes=-10, 0-5',
+    # Malformed
+    'bytes=a-b',
+    'bytes=-',
+    'bytes=50-10',
+])
+def test_whole_body(sv, header):
+    assert sv.parse_byte_range(header, SIZE) is None
+    
+    
+@pytest.mark.parametrize('header', ['bytes=1000-', 'bytes=1000-1999', 'bytes=5000-6000',
+                                    'bytes=-0'])
+def test_unsatisfiable(sv, header):
+    with pytest.raises(ValueError):
+        sv.parse_byte_range(header, SIZE)
+        
+        
+def test_empty_file(sv):
+    with pytest.raises(ValueError):
+        sv.parse_byte_range('bytes=0-', 0)
+        
+        
+def query(algorithm, n):
+    return {'algorithm': [algorithm], 'distribution': ['sorted'], 'seed': ['1'], 'n': [str(n)]}
+    
+    
+@pytest.mark.parametrize('algorithm', ['Bubble Sort', 'Quick Sort', 'Shell Sort'])
+def test_expensive_algorithms_get_the_small_limit(sv, algorithm):
+    assert sv.trace_key(query(algorithm, 3000), 100000, 3000)[3] == 3000
+    with pytest.raises(ValueError):
+        sv.trace_key(query(algorithm, 3001), 100000, 3000)
+        
+        
+def test_other_algorithms_get_the_full_limit(sv):
+    assert sv.trace_key(query('Merge Sort', 100000), 100000, 3000)[3] == 100000
+    with pytest.raises(ValueError):
+        sv.trace_key(query('Merge Sort', 100001), 100000, 3000)
@@ -0,0 +1,65 @@
+import pytest
+
+
+ALGORITHMS = ['Bubble Sort', 'Merge Sort', 'Quick Sort', 'Counting Sort',
+              'Radix Sort (LSD)', 'Heap Sort', 'Timsort']
+
+
+def read_back(sv, path):
+    reader = sv.TraceReader(path)
+    return reader, list(reader.events())
+
+
+@pytest.mark.parametrize('name', ALGORITHMS)
+def test_record_trace_round_trip(sv, tmp_path, name):
+    array = sv.generate_input('uniform', 200, 7).tolist()
+    path = tmp_path / 'run.svtr'
+    steps = sv.record_trace(name, array, path)
+    expected = list(sv.sort_generators[name](list(array)))
+    
+    reader, events = read_back(sv, path)
+    assert steps == len(expected) == len(reader) == reader.steps
+    assert reader.n == len(array)
+    assert reader.array.tolist() == array
+    assert [event[:3] for event in events] == [event[:3] for event in expected]
+    assert ([sv.format_step(event[3]) for event in events]
+            == [sv.format_step(event[3]) for event in expected])
+            
+            
+def test_texts_that_are_not_templates(sv, tmp_path):
+    # Literal strings, braces, too many args and args past int32 all come
+    # back as the same formatted text
+    texts = [None, 'plain {text}', (sv.TEXT_SWAP, 3, 4), (sv.TEXT_SWAP, 2 ** 40, 1),
+             (sv.TEXT_SWAP, 1.5, 2), (sv.step_template('{} {} {}'), 1, 2, 3), 'plain {text}']
+    path = tmp_path / 'texts.svtr'
+    templates = len(sv.STEP_TEMPLATES)
+    with sv.TraceWriter(path, [5, 6]) as writer:
+        for k, text in enumerate(texts):
+            writer.write((sv.OP_STEP, k, 0, text))
+    reader, events = read_back(sv, path)
+    assert [sv.format_step(event[3]) for event in events] == [sv.format_step(t) for t in texts]
+    assert [event[1] for event in events] == list(range(len(texts)))
+    assert len(reader.texts) == 5
+    assert len(sv.STEP_TEMPLATES) == templates
+    
+    
+def test_empty_trace(sv, tmp_path):
+    path = tmp_path / 'empty.svtr'
+    sv.TraceWriter(path, []).close()
+    reader, events = read_back(sv, path)
+    assert (reader.n, reader.steps, events) == (0, 0, [])
+    
+    
+def test_events_from_offset(sv, tmp_path):
+    array = sv.generate_input('reversed', 60, 1).tolist()
+    path = tmp_path / 'run.svtr'
+    sv.record_trace('Insertion Sort', array, path)
+    reader, events = read_back(sv, path)
+    assert list(reader.events(25)) == events[25:]
+    
+    
+def test_rejects_other_files(sv, tmp_path):
+    path = tmp_path / 'other.bin'
+    path.write_bytes(b'\0' * 64)
+    with pytest.raises(ValueError):
+        sv.TraceReader(path)